@@ -1,28 +1,64 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, url_for, Response
 from src.models.user import db, User
-from src.models.order import Order, OrderItem, CartItem
+from src.models.order import Order, OrderItem, CartItem, get_cart_versions, bump_cart_version
 from src.models.house_plan import HousePlan
-from sqlalchemy import and_
+from src.models.serializers import (serialize_orders, serialize_plans, serialize_cart, serialize_guest_cart,
+                                    cart_statement, cart_item_from_row)
+from src.routes.pagination import keyset_paginate
+from src.routes.response_cache import checkout_summary_cache
+from src.routes.plan_downloads import order_plan_files, read_download_token, plan_file_response, PAID_ORDER_STATUSES
+from src.routes.guest_cart import (resolve_cart_user, read_guest_cart, save_guest_cart, clear_guest_cart,
+                                   GuestCartFull)
+from sqlalchemy import and_, update, delete
+from sqlalchemy.orm import load_only
+from itsdangerous import BadSignature, SignatureExpired
 
 cart_bp = Blueprint('cart', __name__)
 
+# Operations accepted by /cart/batch
+CART_BATCH_OPERATIONS = ('add', 'update', 'remove')
+
+def cart_int(value, name, minimum=None):
+    """Read a plan id, item id or quantity from a JSON body (numbers or numeric strings)
+
+    Raises ValueError for anything else, so routes can answer 400 instead of
+    failing on it later.
+    """
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f'{name} must be an integer')
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an integer')
+    if minimum is not None and number < minimum:
+        raise ValueError(f'{name} must be at least {minimum}')
+    return number
+
 @cart_bp.route('/cart', methods=['GET'])
 def get_cart():
-    """Get user's cart items"""
+    """Get user's cart items (a guest's come from the signed cart cookie)"""
     try:
         # TODO: Get user_id from authentication
-        user_id = request.args.get('user_id', 1, type=int)
+        user_id = resolve_cart_user(request.args.get('user_id', type=int))
         
-        cart_items = CartItem.query.filter_by(user_id=user_id).all()
+        try:
+            plan_fields = HousePlan.resolve_fields(request.args.get('view'), request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        total_amount = sum(item.plan.price * item.quantity for item in cart_items if item.plan)
+        if user_id is None:
+            # Guest cart: one batched lookup of the plans in the cookie
+            items, total_amount, item_count = serialize_guest_cart(read_guest_cart(), plan_fields)
+        else:
+            # Items, plans and the SQL-side total/count in a fixed number of queries
+            items, total_amount, item_count = serialize_cart(user_id, plan_fields)
         
         return jsonify({
             'success': True,
             'data': {
-                'items': [item.to_dict() for item in cart_items],
+                'items': items,
                 'total_amount': total_amount,
-                'item_count': len(cart_items)
+                'item_count': item_count
             }
         })
     
@@ -40,39 +76,49 @@ def add_to_cart():
             return jsonify({'success': False, 'error': 'Plan ID is required'}), 400
         
         # TODO: Get user_id from authentication
-        user_id = data.get('user_id', 1)
-        plan_id = data['plan_id']
-        quantity = data.get('quantity', 1)
-        
-        # Check if plan exists
-        plan = HousePlan.query.filter_by(id=plan_id, is_active=True).first()
-        if not plan:
+        user_id = resolve_cart_user(data.get('user_id'))
+        try:
+            plan_id = cart_int(data['plan_id'], 'Plan ID')
+            quantity = cart_int(data.get('quantity', 1), 'Quantity', minimum=1)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        if user_id is None:
+            # Guest cart: one plan lookup checks the plan and builds the item, then the cookie is re-signed
+            quantities = read_guest_cart()
+            quantities[plan_id] = quantities.get(plan_id, 0) + quantity
+            
+            items, _, _ = serialize_guest_cart({plan_id: quantities[plan_id]})
+            if items[0]['plan'] is None or not items[0]['plan']['is_active']:
+                return jsonify({'success': False, 'error': 'House plan not found'}), 404
+            
+            response = jsonify({
+                'success': True,
+                'data': items[0],
+                'message': 'Item added to cart successfully'
+            })
+            return save_guest_cart(response, quantities)
+        
+        # Insert or increment in one statement; nothing comes back when the plan doesn't exist
+        added = CartItem.add_quantities(user_id, {plan_id: quantity})
+        if not added:
             return jsonify({'success': False, 'error': 'House plan not found'}), 404
         
-        # Check if item already in cart
-        existing_item = CartItem.query.filter_by(user_id=user_id, plan_id=plan_id).first()
+        bump_cart_version(user_id)
+        db.session.commit()
         
-        if existing_item:
-            # Update quantity
-            existing_item.quantity += quantity
-            db.session.commit()
-            cart_item = existing_item
-        else:
-            # Create new cart item
-            cart_item = CartItem(
-                user_id=user_id,
-                plan_id=plan_id,
-                quantity=quantity
-            )
-            db.session.add(cart_item)
-            db.session.commit()
+        plan_id, (item_id, item_quantity, created_at) = added.popitem()
+        plan = serialize_plans([plan_id])[0]
         
         return jsonify({
             'success': True,
-            'data': cart_item.to_dict(),
+            'data': cart_item_from_row((item_id, user_id, plan_id, item_quantity, created_at), plan, plan['price']),
             'message': 'Item added to cart successfully'
         })
     
+    except GuestCartFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -98,6 +144,7 @@ def update_cart_item(item_id):
         else:
             cart_item.quantity = quantity
         
+        bump_cart_version(cart_item.user_id)
         db.session.commit()
         
         return jsonify({
@@ -119,6 +166,7 @@ def remove_from_cart(item_id):
             return jsonify({'success': False, 'error': 'Cart item not found'}), 404
         
         db.session.delete(cart_item)
+        bump_cart_version(cart_item.user_id)
         db.session.commit()
         
         return jsonify({
@@ -135,15 +183,199 @@ def clear_cart():
     """Clear all items from cart"""
     try:
         # TODO: Get user_id from authentication
-        user_id = request.args.get('user_id', 1, type=int)
+        user_id = resolve_cart_user(request.args.get('user_id', type=int))
         
-        CartItem.query.filter_by(user_id=user_id).delete()
-        db.session.commit()
+        if user_id is not None:
+            CartItem.query.filter_by(user_id=user_id).delete()
+            bump_cart_version(user_id)
+            db.session.commit()
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'message': 'Cart cleared successfully'
         })
+        return clear_guest_cart(response) if user_id is None else response
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@cart_bp.route('/cart/merge', methods=['POST'])
+def merge_guest_cart():
+    """Move the guest cart cookie into a signed-in user's cart (call right after login)"""
+    try:
+        data = request.get_json(silent=True)
+        
+        if not isinstance(data, dict) or data.get('user_id') is None:
+            return jsonify({'success': False, 'error': 'User ID is required'}), 400
+        
+        try:
+            user_id = cart_int(data['user_id'], 'user_id', minimum=1)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        if db.session.get(User, user_id) is None:
+            return jsonify({'success': False, 'error': 'User not found'}), 404
+        
+        try:
+            plan_fields = HousePlan.resolve_fields(request.args.get('view'), request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        # One upsert adds the guest quantities; gone or inactive plans are dropped
+        merged = {}
+        guest_quantities = read_guest_cart()
+        if guest_quantities:
+            merged = CartItem.add_quantities(user_id, guest_quantities)
+            bump_cart_version(user_id)
+            db.session.commit()
+        
+        items, total_amount, item_count = serialize_cart(user_id, plan_fields)
+        
+        response = jsonify({
+            'success': True,
+            'data': {
+                'items': items,
+                'total_amount': total_amount,
+                'item_count': item_count
+            },
+            'message': f'{len(merged)} guest cart items merged'
+        })
+        return clear_guest_cart(response)
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@cart_bp.route('/cart/batch', methods=['POST'])
+def batch_update_cart():
+    """Apply several add/update/remove operations to a cart in one transaction"""
+    try:
+        data = request.get_json()
+        
+        operations = data.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'success': False, 'error': 'Operations are required'}), 400
+        
+        user_id = resolve_cart_user(data.get('user_id'))
+        
+        try:
+            plan_fields = HousePlan.resolve_fields(request.args.get('view'), request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        # Validate every operation before touching the cart
+        for index, operation in enumerate(operations):
+            op = operation.get('op') if isinstance(operation, dict) else None
+            if op not in CART_BATCH_OPERATIONS:
+                return jsonify({'success': False,
+                                'error': f'Operation {index}: op must be one of {", ".join(CART_BATCH_OPERATIONS)}'}), 400
+            if op == 'add' and 'plan_id' not in operation:
+                return jsonify({'success': False, 'error': f'Operation {index}: Plan ID is required'}), 400
+            if op != 'add' and 'item_id' not in operation and 'plan_id' not in operation:
+                return jsonify({'success': False, 'error': f'Operation {index}: Item ID or plan ID is required'}), 400
+            if op == 'update' and 'quantity' not in operation:
+                return jsonify({'success': False, 'error': f'Operation {index}: Quantity is required'}), 400
+            
+            # Ids key the cart (and the guest cookie) as ints, so string ids must be normalized here
+            try:
+                for key in ('plan_id', 'item_id'):
+                    if key in operation:
+                        operation[key] = cart_int(operation[key], 'Plan ID' if key == 'plan_id' else 'Item ID')
+                if op == 'add':
+                    operation['quantity'] = cart_int(operation.get('quantity', 1), 'Quantity', minimum=1)
+                elif op == 'update':
+                    operation['quantity'] = cart_int(operation['quantity'], 'Quantity')
+            except ValueError as e:
+                return jsonify({'success': False, 'error': f'Operation {index}: {e}'}), 400
+        
+        # One existence query for every plan being added
+        added_plan_ids = {operation['plan_id'] for operation in operations if operation['op'] == 'add'}
+        active_plan_ids = set()
+        if added_plan_ids:
+            active_plan_ids = {row[0] for row in db.session.query(HousePlan.id)
+                                                          .filter(HousePlan.id.in_(added_plan_ids),
+                                                                  HousePlan.is_active == True)}
+        missing_plan_ids = sorted(added_plan_ids - active_plan_ids)
+        if missing_plan_ids:
+            return jsonify({'success': False,
+                            'error': f'House plan not found: {", ".join(map(str, missing_plan_ids))}'}), 404
+        
+        if user_id is None:
+            # Guest items have no ids, so guests address them by plan_id; the cookie is rewritten once at the end
+            quantities = read_guest_cart()
+            for index, operation in enumerate(operations):
+                plan_id = operation.get('plan_id')
+                
+                if operation['op'] == 'add':
+                    quantities[plan_id] = quantities.get(plan_id, 0) + operation['quantity']
+                    continue
+                
+                if quantities.get(plan_id, 0) <= 0:
+                    return jsonify({'success': False, 'error': f'Operation {index}: Cart item not found'}), 404
+                
+                if operation['op'] == 'update' and operation['quantity'] > 0:
+                    quantities[plan_id] = operation['quantity']
+                else:
+                    # Remove, or update to 0 or a negative quantity
+                    quantities[plan_id] = 0
+            
+            quantities = {plan_id: quantity for plan_id, quantity in quantities.items() if quantity > 0}
+            items, total_amount, item_count = serialize_guest_cart(quantities, plan_fields)
+        else:
+            # Each operation is a single statement on the rows it names (no read-modify-write of the
+            # cart), so items added concurrently through /cart/add are summed, never overwritten
+            added = {}
+            for index, operation in enumerate(operations):
+                if operation['op'] == 'add':
+                    added[operation['plan_id']] = added.get(operation['plan_id'], 0) + operation['quantity']
+                    continue
+                
+                # Consecutive adds go out as one upsert, before the operation that follows them
+                if added:
+                    CartItem.add_quantities(user_id, added)
+                    added = {}
+                
+                if 'plan_id' in operation:
+                    target = and_(CartItem.user_id == user_id, CartItem.plan_id == operation['plan_id'])
+                else:
+                    target = and_(CartItem.user_id == user_id, CartItem.id == operation['item_id'])
+                
+                if operation['op'] == 'update' and operation['quantity'] > 0:
+                    statement = update(CartItem).where(target).values(quantity=operation['quantity'])
+                else:
+                    # Remove, or update to 0 or a negative quantity
+                    statement = delete(CartItem).where(target)
+                
+                if not db.session.execute(statement.execution_options(synchronize_session=False)).rowcount:
+                    db.session.rollback()
+                    return jsonify({'success': False, 'error': f'Operation {index}: Cart item not found'}), 404
+            
+            if added:
+                CartItem.add_quantities(user_id, added)
+            
+            bump_cart_version(user_id)
+            db.session.commit()
+            
+            items, total_amount, item_count = serialize_cart(user_id, plan_fields)
+        
+        response = jsonify({
+            'success': True,
+            'data': {
+                'items': items,
+                'total_amount': total_amount,
+                'item_count': item_count
+            },
+            'message': 'Cart updated successfully'
+        })
+        return save_guest_cart(response, quantities) if user_id is None else response
+    
+    except GuestCartFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': f'Invalid cart operation: {e}'}), 400
     
     except Exception as e:
         db.session.rollback()
@@ -157,8 +389,35 @@ def get_orders():
         user_id = request.args.get('user_id', 1, type=int)
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
+        
+        # Keyset pagination when a cursor is given (empty cursor for the first page)
+        if cursor is not None:
+            query = Order.query.filter_by(user_id=user_id).options(load_only(Order.id, Order.created_at))
+            keys = [(Order.created_at, True), (Order.id, True)]
+            
+            try:
+                orders, next_cursor = keyset_paginate(query, keys, cursor, per_page)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            pagination_info = {
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+            if include_total:
+                pagination_info['total'] = query.count()
+            
+            return jsonify({
+                'success': True,
+                'data': serialize_orders([order.id for order in orders]),
+                'pagination': pagination_info
+            })
         
         pagination = Order.query.filter_by(user_id=user_id)\
+                               .options(load_only(Order.id, Order.created_at))\
                                .order_by(Order.created_at.desc())\
                                .paginate(page=page, per_page=per_page, error_out=False)
         
@@ -166,7 +425,7 @@ def get_orders():
         
         return jsonify({
             'success': True,
-            'data': [order.to_dict() for order in orders],
+            'data': serialize_orders([order.id for order in orders]),
             'pagination': {
                 'page': page,
                 'per_page': per_page,
@@ -184,13 +443,13 @@ def get_orders():
 def get_order(order_id):
     """Get specific order details"""
     try:
-        order = Order.query.get(order_id)
-        if not order:
+        orders = serialize_orders([order_id])
+        if not orders:
             return jsonify({'success': False, 'error': 'Order not found'}), 404
         
         return jsonify({
             'success': True,
-            'data': order.to_dict()
+            'data': orders[0]
         })
     
     except Exception as e:
@@ -203,16 +462,23 @@ def create_order():
         data = request.get_json()
         
         # TODO: Get user_id from authentication
-        user_id = data.get('user_id', 1)
+        user_id = resolve_cart_user(data.get('user_id'))
+        if user_id is None:
+            # Orders need an account; the guest cart stays in its cookie until sign-in
+            return jsonify({'success': False, 'error': 'Sign in to check out'}), 401
         
-        # Get cart items
-        cart_items = CartItem.query.filter_by(user_id=user_id).all()
+        # Fold a guest cart into the user's cart first, in one upsert (gone or inactive plans are dropped)
+        guest_quantities = read_guest_cart()
+        if guest_quantities:
+            CartItem.add_quantities(user_id, guest_quantities)
         
-        if not cart_items:
+        # Cart lines with plan prices and the SQL-side total in one query
+        cart_rows = db.session.execute(cart_statement(user_id, ('id', 'price'))).all()
+        
+        if not cart_rows:
             return jsonify({'success': False, 'error': 'Cart is empty'}), 400
         
-        # Calculate total amount
-        total_amount = sum(item.plan.price * item.quantity for item in cart_items if item.plan)
+        total_amount = cart_rows[0][-2] or 0
         
         # Create order
         order = Order(
@@ -228,27 +494,32 @@ def create_order():
         db.session.add(order)
         db.session.flush()  # Get order ID
         
-        # Create order items
-        for cart_item in cart_items:
-            order_item = OrderItem(
-                order_id=order.id,
-                plan_id=cart_item.plan_id,
-                quantity=cart_item.quantity,
-                unit_price=cart_item.plan.price,
-                total_price=cart_item.plan.price * cart_item.quantity
-            )
-            db.session.add(order_item)
+        # Create order items in one executemany insert
+        order_id = order.id
+        db.session.execute(OrderItem.__table__.insert(), [
+            {
+                'order_id': order_id,
+                'plan_id': plan_id,
+                'quantity': quantity,
+                'unit_price': price,
+                'total_price': price * quantity
+            }
+            for _, _, plan_id, quantity, _, found_plan_id, price, _, _ in cart_rows
+            if found_plan_id is not None
+        ])
         
         # Clear cart
         CartItem.query.filter_by(user_id=user_id).delete()
+        bump_cart_version(user_id)
         
         db.session.commit()
         
-        return jsonify({
+        response = jsonify({
             'success': True,
-            'data': order.to_dict(),
+            'data': serialize_orders([order_id])[0],
             'message': 'Order created successfully'
-        }), 201
+        })
+        return clear_guest_cart(response), 201
     
     except Exception as e:
         db.session.rollback()
@@ -284,31 +555,96 @@ def update_order_status(order_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@cart_bp.route('/orders/<int:order_id>/downloads', methods=['GET'])
+def get_order_downloads(order_id):
+    """List the plan files a paid order unlocks, with expiring signed download links"""
+    try:
+        user_id = request.args.get('user_id', 1, type=int)
+        
+        order = Order.query.filter_by(id=order_id, user_id=user_id).first()
+        if not order:
+            return jsonify({'success': False, 'error': 'Order not found'}), 404
+        
+        if order.status not in PAID_ORDER_STATUSES:
+            return jsonify({'success': False, 'error': 'Order has not been paid'}), 403
+        
+        plans = order_plan_files(order)
+        for plan in plans:
+            for plan_file in plan['files']:
+                token = plan_file.pop('token', None)
+                if token:
+                    plan_file['url'] = url_for('cart.download_plan_file', token=token)
+        
+        response = jsonify({
+            'success': True,
+            'data': plans,
+            'expires_in': current_app.config['DOWNLOAD_TOKEN_MAX_AGE']
+        })
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@cart_bp.route('/downloads/<token>', methods=['GET'])
+def download_plan_file(token):
+    """Serve a purchased plan file from a signed link (supports Range requests for resuming)"""
+    try:
+        try:
+            _, _, digest, name = read_download_token(token)
+        except SignatureExpired:
+            return jsonify({'success': False, 'error': 'Download link has expired'}), 410
+        except BadSignature:
+            return jsonify({'success': False, 'error': 'Invalid download link'}), 403
+        
+        response = plan_file_response(digest, name)
+        if response is None:
+            return jsonify({'success': False, 'error': 'File not found'}), 404
+        return response
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @cart_bp.route('/checkout/summary', methods=['POST'])
 def get_checkout_summary():
-    """Get checkout summary"""
+    """Get checkout summary (cached per cart and catalog version for signed-in users)"""
     try:
         data = request.get_json()
         
         # TODO: Get user_id from authentication
-        user_id = data.get('user_id', 1)
+        user_id = resolve_cart_user(data.get('user_id'))
         
-        # Get cart items
-        cart_items = CartItem.query.filter_by(user_id=user_id).all()
+        try:
+            plan_fields = HousePlan.resolve_fields(request.args.get('view'), request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        if not cart_items:
+        if user_id is None:
+            # Guest cart: one batched lookup of the plans in the cookie
+            items, subtotal, _ = serialize_guest_cart(read_guest_cart(), plan_fields)
+        else:
+            # Any cart or catalog write changes the key, so an unchanged cart is served from memory
+            cart_version, catalog_version = get_cart_versions(user_id)
+            cache_key = (user_id, cart_version, catalog_version, tuple(plan_fields) if plan_fields else None)
+            cached = checkout_summary_cache.get(cache_key)
+            if cached is not None:
+                return Response(cached, mimetype='application/json')
+            
+            # Items, plans and the SQL-side subtotal in a fixed number of queries
+            items, subtotal, _ = serialize_cart(user_id, plan_fields)
+        
+        if not items:
             return jsonify({'success': False, 'error': 'Cart is empty'}), 400
         
         # Calculate totals
-        subtotal = sum(item.plan.price * item.quantity for item in cart_items if item.plan)
         tax_rate = 0.15  # 15% VAT in South Africa
         tax_amount = subtotal * tax_rate
         total_amount = subtotal + tax_amount
         
-        return jsonify({
+        response = jsonify({
             'success': True,
             'data': {
-                'items': [item.to_dict() for item in cart_items],
+                'items': items,
                 'subtotal': subtotal,
                 'tax_rate': tax_rate,
                 'tax_amount': tax_amount,
@@ -316,7 +652,21 @@ def get_checkout_summary():
                 'currency': 'ZAR'
             }
         })
+        if user_id is not None:
+            checkout_summary_cache.set(cache_key, response.get_data())
+        return response
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@cart_bp.route('/checkout/summary/cache-stats', methods=['GET'])
+def get_checkout_summary_cache_stats():
+    """Get checkout summary cache counters (Admin only)"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': checkout_summary_cache.stats()
+        })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,32 @@
+from src.models.user import db
+from datetime import datetime
+
+class CatalogVersion(db.Model):
+    """Single-row write counter for the public catalog (plans, categories, payment methods)"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<CatalogVersion {self.version}>'
+
+def init_catalog_version():
+    """Create the catalog version row if it does not exist yet"""
+    if db.session.get(CatalogVersion, 1) is None:
+        db.session.add(CatalogVersion(id=1, version=1, updated_at=datetime.utcnow()))
+        db.session.commit()
+
+def get_catalog_version():
+    """Get the current (version, updated_at) of the catalog"""
+    row = db.session.query(CatalogVersion.version, CatalogVersion.updated_at)\
+                    .filter(CatalogVersion.id == 1).first()
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at
+
+def bump_catalog_version():
+    """Bump the catalog version as part of the current transaction"""
+    db.session.query(CatalogVersion).filter(CatalogVersion.id == 1).update({
+        CatalogVersion.version: CatalogVersion.version + 1,
+        CatalogVersion.updated_at: datetime.utcnow()
+    }, synchronize_session=False)
@@ -0,0 +1,137 @@
+from flask import Flask
+from src.models.user import db, User
+from src.models.house_plan import HousePlan
+from src.models.catalog import init_catalog_version
+from src.models.catalog_engine import CatalogEngine
+from src.routes.house_plans import filter_plans_query
+from src.routes.pagination import page_bounds, page_info
+from werkzeug.datastructures import MultiDict
+from datetime import datetime, timedelta
+import os
+import random
+import tempfile
+import time
+
+# Representative /house-plans filter combinations
+BENCHMARK_FILTERS = [
+    ('no filters', {}),
+    ('price range', {'min_price': '1500', 'max_price': '3000'}),
+    ('bedrooms', {'bedrooms': '3'}),
+    ('bedrooms + bathrooms', {'bedrooms': '4', 'bathrooms': '3'}),
+    ('style', {'style': 'modern'}),
+    ('featured', {'featured': 'true'}),
+    ('deep page', {'page': '200'}),
+]
+
+# Out-of-range paging, which both paths must clamp the same way
+PAGINATION_EDGE_CASES = [
+    ('page 0', {'page': '0'}),
+    ('negative page', {'page': '-3'}),
+    ('per_page 0', {'per_page': '0'}),
+    ('negative per_page', {'per_page': '-1'}),
+    ('large per_page', {'per_page': '500'}),
+    ('page past the end', {'page': '100000'}),
+]
+
+STYLES = ['Modern', 'Traditional', 'Contemporary', 'Farmhouse', 'Minimalist', 'Urban', 'Luxury', 'Cottage']
+
+def seed_plans(plan_count, batch_size=5000):
+    """Insert synthetic plans with executemany batches"""
+    admin = User(email='bench@example.com', first_name='Bench', last_name='Mark')
+    admin.set_password('bench')
+    db.session.add(admin)
+    db.session.commit()
+
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    for offset in range(0, plan_count, batch_size):
+        rows = []
+        for index in range(offset, min(offset + batch_size, plan_count)):
+            rows.append({
+                'title': f'Plan {index}',
+                'description': 'Synthetic benchmark plan',
+                'price': float(rng.randint(500, 8000)),
+                'bedrooms': rng.randint(1, 6),
+                'bathrooms': float(rng.randint(2, 10)) / 2,
+                'stories': rng.randint(1, 3),
+                'garage_spaces': rng.randint(0, 3),
+                'square_footage': rng.randint(800, 6000),
+                'style_category': rng.choice(STYLES),
+                'is_featured': rng.random() < 0.05,
+                'is_active': rng.random() < 0.95,
+                'created_at': start + timedelta(seconds=index * 37 + rng.randint(0, 30)),
+                'updated_at': start,
+                'created_by': admin.id
+            })
+        db.session.execute(HousePlan.__table__.insert(), rows)
+        db.session.commit()
+
+def time_call(function, repeat):
+    """Best wall time of repeated calls, in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run_catalog_benchmark(plan_count=50000, repeat=10, per_page=12):
+    """Compare the SQL and in-memory engine paths of /house-plans on a synthetic catalog"""
+    bench_app = Flask(__name__)
+
+    with tempfile.TemporaryDirectory() as directory:
+        bench_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        bench_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(bench_app)
+
+        with bench_app.app_context():
+            db.create_all()
+            init_catalog_version()
+            seed_plans(plan_count)
+
+            engine = CatalogEngine()
+            build_ms, _ = time_call(engine.build, 1)
+
+            results = []
+            for name, params in BENCHMARK_FILTERS + PAGINATION_EDGE_CASES:
+                args = MultiDict(params)
+                page = args.get('page', 1, type=int)
+                page_size = args.get('per_page', per_page, type=int)
+
+                # Both return the page's plan ids and the pagination block /house-plans reports
+                def sql_path():
+                    query, _ = filter_plans_query(HousePlan.query.filter(HousePlan.is_active == True), args)
+                    query = query.order_by(HousePlan.is_featured.desc(), HousePlan.created_at.desc(),
+                                           HousePlan.id.desc())
+                    pagination = query.paginate(page=page, per_page=page_size, error_out=False)
+                    return [plan.id for plan in pagination.items], {
+                        'page': page,
+                        'per_page': page_size,
+                        'total': pagination.total,
+                        'pages': pagination.pages,
+                        'has_next': pagination.has_next,
+                        'has_prev': pagination.has_prev
+                    }
+
+                def engine_path():
+                    plan_ids, total = engine.query(args, *page_bounds(page, page_size))
+                    plans = engine.hydrate(HousePlan.query, plan_ids)
+                    return [plan.id for plan in plans], page_info(page, page_size, total)
+
+                sql_ms, sql_result = time_call(sql_path, repeat)
+                engine_ms, engine_result = time_call(engine_path, repeat)
+                db.session.remove()
+
+                results.append({
+                    'filter': name,
+                    'sql_ms': round(sql_ms, 3),
+                    'engine_ms': round(engine_ms, 3),
+                    'speedup': round(sql_ms / engine_ms, 1) if engine_ms else None,
+                    'same_results': sql_result == engine_result
+                })
+
+            db.session.remove()
+            db.engine.dispose()
+
+    return {'plans': plan_count, 'build_ms': round(build_ms, 3), 'results': results}
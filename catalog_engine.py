@@ -0,0 +1,380 @@
+from src.models.user import db
+from src.models.house_plan import HousePlan
+from src.models.catalog import get_catalog_version
+from datetime import datetime, timedelta
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, the SQL path is used without it
+    np = None
+
+EPOCH = datetime(1970, 1, 1)
+
+# Numeric plan features used for "similar plans", compared on z-scores
+SIMILARITY_FEATURES = ('bedrooms', 'bathrooms', 'stories', 'garage_spaces', 'square_footage', 'price')
+
+# Distance added when two plans have a different style_category
+STYLE_MISMATCH_PENALTY = 1.0
+
+# Length of the precomputed similar-plan lists kept for featured plans
+SIMILAR_CACHE_SIZE = 12
+
+# Newest featured plans whose similar lists are precomputed when the snapshot is built
+SIMILAR_WARM_LIMIT = 48
+
+# /house-plans query params the engine can answer (anything else falls back to SQL)
+ENGINE_ARGS = {'page', 'per_page', 'style', 'min_price', 'max_price', 'bedrooms', 'bathrooms',
+               'featured', 'view', 'fields'}
+
+class CatalogEngine:
+    """Columnar in-memory snapshot of active house plans for vectorized filtering
+
+    The snapshot is tagged with the catalog version it reflects. Local plan writes
+    are applied incrementally; any write it did not see (e.g. from another worker)
+    triggers a full rebuild on the next query.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.RLock()
+        self._reset()
+
+    def init_app(self, app):
+        """Enable the engine when CATALOG_ENGINE is set and NumPy is installed"""
+        app.config.setdefault('CATALOG_ENGINE', False)
+        self.enabled = bool(app.config['CATALOG_ENGINE']) and np is not None
+
+    def _reset(self):
+        self.version = None
+        self.size = 0
+        self._slots = {}
+        self._styles = []
+        self._style_codes = {}
+        self._columns = {}
+        self._feature_count = 0
+        self._feature_sums = None
+        self._feature_squares = None
+        self._similar = {}  # plan id -> (similar plan ids, distance of the last one)
+
+    def _allocate(self, capacity):
+        return {
+            'id': np.zeros(capacity, dtype=np.int64),
+            'price': np.zeros(capacity, dtype=np.float64),
+            'bedrooms': np.zeros(capacity, dtype=np.int32),
+            'bathrooms': np.zeros(capacity, dtype=np.float64),
+            'stories': np.zeros(capacity, dtype=np.int32),
+            'garage_spaces': np.zeros(capacity, dtype=np.int32),
+            'square_footage': np.zeros(capacity, dtype=np.int64),
+            'style': np.zeros(capacity, dtype=np.int32),
+            'is_featured': np.zeros(capacity, dtype=bool),
+            'created_at': np.zeros(capacity, dtype=np.int64),
+            'alive': np.zeros(capacity, dtype=bool),
+            # Raw SIMILARITY_FEATURES per slot; distances scale them by the running standard deviation
+            'features': np.zeros((capacity, len(SIMILARITY_FEATURES)), dtype=np.float64)
+        }
+
+    def _style_code(self, style):
+        code = self._style_codes.get(style)
+        if code is None:
+            code = len(self._styles)
+            self._styles.append(style)
+            self._style_codes[style] = code
+        return code
+
+    @staticmethod
+    def _timestamp(value):
+        return (value - EPOCH) // timedelta(microseconds=1) if value else -(2 ** 62)
+
+    def _write_slot(self, slot, row):
+        columns = self._columns
+        columns['id'][slot] = row.id
+        columns['price'][slot] = row.price
+        columns['bedrooms'][slot] = row.bedrooms
+        columns['bathrooms'][slot] = row.bathrooms
+        columns['stories'][slot] = row.stories
+        columns['garage_spaces'][slot] = row.garage_spaces or 0
+        columns['square_footage'][slot] = row.square_footage
+        columns['style'][slot] = self._style_code(row.style_category)
+        columns['is_featured'][slot] = bool(row.is_featured)
+        columns['created_at'][slot] = self._timestamp(row.created_at)
+        columns['alive'][slot] = True
+        columns['features'][slot] = [float(getattr(row, name) or 0) for name in SIMILARITY_FEATURES]
+
+    def build(self):
+        """Load every active plan into a fresh snapshot"""
+        with self._lock:
+            version, _ = get_catalog_version()
+            rows = db.session.query(
+                HousePlan.id, HousePlan.price, HousePlan.bedrooms, HousePlan.bathrooms,
+                HousePlan.stories, HousePlan.garage_spaces, HousePlan.square_footage,
+                HousePlan.style_category, HousePlan.is_featured, HousePlan.created_at
+            ).filter(HousePlan.is_active == True).all()
+
+            self._reset()
+            self._columns = self._allocate(max(len(rows), 16))
+            for slot, row in enumerate(rows):
+                self._write_slot(slot, row)
+                self._slots[row.id] = slot
+            self.size = len(rows)
+            self.version = version
+
+            features = self._columns['features'][:self.size]
+            self._feature_count = self.size
+            self._feature_sums = features.sum(axis=0)
+            self._feature_squares = (features * features).sum(axis=0)
+            self._warm_similar()
+
+    def ensure_fresh(self):
+        """Rebuild the snapshot if the catalog changed behind its back"""
+        version, _ = get_catalog_version()
+        with self._lock:
+            if self.version != version:
+                self.build()
+
+    def invalidate(self):
+        """Force a rebuild on the next query (after bulk writes)"""
+        with self._lock:
+            self.version = None
+
+    def plan_changed(self, plan, version):
+        """Apply a committed plan write that produced the given catalog version
+
+        Only the plan's own slot, its feature row and the similar-plan lists it
+        was in (or now ranks within) are updated, so a write costs a handful of
+        neighbour searches rather than a rebuild.
+        """
+        with self._lock:
+            if self.version is None:
+                return
+            if version != self.version + 1:
+                # Missed a write from elsewhere, rebuild lazily
+                self.version = None
+                return
+
+            slot = self._slots.get(plan.id)
+            if slot is not None and self._columns['alive'][slot]:
+                self._count_features(slot, -1)
+            if plan.is_active:
+                if slot is None:
+                    slot = self.size
+                    if slot >= len(self._columns['id']):
+                        grown = self._allocate(2 * len(self._columns['id']))
+                        for name, column in self._columns.items():
+                            grown[name][:len(column)] = column
+                        self._columns = grown
+                    self._slots[plan.id] = slot
+                    self.size += 1
+                self._write_slot(slot, plan)
+                self._count_features(slot, 1)
+            elif slot is not None:
+                self._columns['alive'][slot] = False
+
+            self.version = version
+            self._refresh_similar(plan.id, slot)
+
+    def supports(self, args):
+        """Check whether every non-empty query param is one the engine can answer"""
+        return all(key in ENGINE_ARGS for key, value in args.items() if value)
+
+    def query(self, args, page, per_page):
+        """Filter, sort and page the snapshot, returning (plan ids on the page, total)
+
+        page and per_page must already be clamped (see pagination.page_bounds).
+        """
+        self.ensure_fresh()
+
+        style = args.get('style', '')
+        min_price = args.get('min_price', type=float)
+        max_price = args.get('max_price', type=float)
+        bedrooms = args.get('bedrooms', type=int)
+        bathrooms = args.get('bathrooms', type=float)
+        featured_only = args.get('featured', 'false').lower() == 'true'
+
+        with self._lock:
+            columns = {name: column[:self.size] for name, column in self._columns.items()}
+
+            mask = columns['alive'].copy()
+            if style:
+                needle = style.lower()
+                codes = [code for code, name in enumerate(self._styles) if name and needle in name.lower()]
+                mask &= np.isin(columns['style'], codes)
+            if min_price is not None:
+                mask &= columns['price'] >= min_price
+            if max_price is not None:
+                mask &= columns['price'] <= max_price
+            if bedrooms is not None:
+                mask &= columns['bedrooms'] == bedrooms
+            if bathrooms is not None:
+                mask &= columns['bathrooms'] == bathrooms
+            if featured_only:
+                mask &= columns['is_featured']
+
+            matches = np.flatnonzero(mask)
+            total = len(matches)
+
+            # Featured first, then newest, then highest id (np.lexsort sorts by the last key first)
+            order = np.lexsort((
+                -columns['id'][matches],
+                -columns['created_at'][matches],
+                ~columns['is_featured'][matches]
+            ))
+            start = (page - 1) * per_page
+            page_slots = matches[order[start:start + per_page]]
+            return [int(plan_id) for plan_id in columns['id'][page_slots]], total
+
+    def _count_features(self, slot, sign):
+        """Add (sign=1) or remove (sign=-1) a slot's features in the running sums behind the z-score scale"""
+        row = self._columns['features'][slot]
+        self._feature_count += sign
+        self._feature_sums += sign * row
+        self._feature_squares += sign * row * row
+
+    def _feature_scale(self):
+        """Per-feature standard deviation over active plans (z-score distances only depend on it)"""
+        if self._feature_count <= 0:
+            return np.ones(len(SIMILARITY_FEATURES))
+        mean = self._feature_sums / self._feature_count
+        std = np.sqrt(np.maximum(self._feature_squares / self._feature_count - mean * mean, 0.0))
+        std[std == 0] = 1.0
+        return std
+
+    def _distances(self, slot, targets=None):
+        """Normalized squared distances from a slot to the target slots (every slot by default)"""
+        features = self._columns['features'][:self.size]
+        styles = self._columns['style'][:self.size]
+        if targets is not None:
+            features, styles = features[targets], styles[targets]
+        distances = (((features - self._columns['features'][slot]) / self._feature_scale()) ** 2).sum(axis=1)
+        distances += STYLE_MISMATCH_PENALTY * (styles != self._columns['style'][slot])
+        return distances
+
+    def _nearest(self, slots, k):
+        """Top-k nearest plans for each of the given slots, as (plan ids, distance of the last one)"""
+        alive = self._columns['alive'][:self.size]
+        ids = self._columns['id'][:self.size]
+
+        neighbours = []
+        for slot in slots:
+            distances = self._distances(slot)
+            distances[~alive] = np.inf
+            distances[slot] = np.inf
+
+            count = min(k, int(np.isfinite(distances).sum()))
+            if count == 0:
+                neighbours.append(([], np.inf))
+                continue
+            candidates = np.argpartition(distances, count - 1)[:count]
+            candidates = candidates[np.lexsort((ids[candidates], distances[candidates]))]
+            # A list shorter than k takes any newcomer, so its bound is infinite
+            bound = float(distances[candidates[-1]]) if count == k else np.inf
+            neighbours.append(([int(plan_id) for plan_id in ids[candidates]], bound))
+        return neighbours
+
+    def _warm_similar(self):
+        """Precompute the similar-plan lists of the newest featured plans"""
+        self._similar = {}
+        featured = np.flatnonzero(self._columns['alive'][:self.size] & self._columns['is_featured'][:self.size])
+        newest = featured[np.argsort(-self._columns['created_at'][featured], kind='stable')][:SIMILAR_WARM_LIMIT]
+        ids = self._columns['id'][newest]
+        for plan_id, entry in zip(ids, self._nearest(newest, SIMILAR_CACHE_SIZE)):
+            self._similar[int(plan_id)] = entry
+
+    def _refresh_similar(self, plan_id, slot):
+        """Re-rank the cached similar lists a write to one plan can change
+
+        That is the plan's own list, lists it appears in, and lists it now
+        falls within (closer than their last entry). Other lists keep their
+        order; the small shift one write makes to the normalization is picked
+        up by the next build().
+        """
+        alive = slot is not None and self._columns['alive'][slot]
+        if not (alive and self._columns['is_featured'][slot]):
+            self._similar.pop(plan_id, None)
+
+        stale = {cached_id for cached_id, (neighbours, _) in self._similar.items()
+                 if cached_id == plan_id or plan_id in neighbours}
+        if alive:
+            others = [cached_id for cached_id in self._similar if cached_id not in stale]
+            if others:
+                others_slots = np.array([self._slots[cached_id] for cached_id in others])
+                distances = self._distances(slot, others_slots)
+                stale.update(cached_id for cached_id, distance in zip(others, distances)
+                             if distance <= self._similar[cached_id][1])
+
+        stale = sorted(stale)
+        for cached_id, entry in zip(stale, self._nearest([self._slots[cached_id] for cached_id in stale],
+                                                         SIMILAR_CACHE_SIZE)):
+            self._similar[cached_id] = entry
+
+    def similar(self, plan_id, k):
+        """Ids of the k plans closest to an active plan (None if it is not in the snapshot)"""
+        self.ensure_fresh()
+
+        with self._lock:
+            cached = self._similar.get(plan_id)
+            if cached is not None and k <= SIMILAR_CACHE_SIZE:
+                return cached[0][:k]
+
+            slot = self._slots.get(plan_id)
+            if slot is None or not self._columns['alive'][slot]:
+                return None
+
+            # Featured plans keep their list, re-ranked by writes that affect it
+            if self._columns['is_featured'][slot]:
+                neighbours = self._nearest([slot], SIMILAR_CACHE_SIZE)[0] if k <= SIMILAR_CACHE_SIZE else None
+                if neighbours is not None:
+                    self._similar[plan_id] = neighbours
+                    return neighbours[0][:k]
+            return self._nearest([slot], k)[0][0]
+
+    def hydrate(self, query, plan_ids):
+        """Load the plans for a page of ids, keeping the engine's order"""
+        if not plan_ids:
+            return []
+        plans = {plan.id: plan for plan in query.filter(HousePlan.id.in_(plan_ids))}
+        return [plans[plan_id] for plan_id in plan_ids if plan_id in plans]
+
+catalog_engine = CatalogEngine()
+
+def similar_plans_fallback(plan_id, k):
+    """CatalogEngine.similar computed per request, for when the engine is off
+
+    Vectorized with NumPy when it is installed, plain Python otherwise.
+    """
+    rows = db.session.query(HousePlan.id, HousePlan.style_category,
+                            *[getattr(HousePlan, name) for name in SIMILARITY_FEATURES])\
+                     .filter(HousePlan.is_active == True).all()
+
+    target = next((row for row in rows if row.id == plan_id), None)
+    if target is None:
+        return None
+
+    if np is not None:
+        ids = np.array([row.id for row in rows], dtype=np.int64)
+        features = np.array([[float(value or 0) for value in row[2:]] for row in rows], dtype=np.float64)
+        std = features.std(axis=0)
+        std[std == 0] = 1.0
+        index = int(np.flatnonzero(ids == plan_id)[0])
+        distances = (((features - features[index]) / std) ** 2).sum(axis=1)
+        distances += STYLE_MISMATCH_PENALTY * np.array([row.style_category != target.style_category for row in rows])
+        distances[index] = np.inf
+        order = np.lexsort((ids, distances))[:min(k, len(rows) - 1)]
+        return [int(plan_id) for plan_id in ids[order]]
+
+    scales = []
+    for name in SIMILARITY_FEATURES:
+        values = [float(getattr(row, name) or 0) for row in rows]
+        mean = sum(values) / len(values)
+        std = (sum((value - mean) ** 2 for value in values) / len(values)) ** 0.5
+        scales.append(std or 1.0)
+
+    def distance(row):
+        total = sum(((float(getattr(row, name) or 0) - float(getattr(target, name) or 0)) / scale) ** 2
+                    for name, scale in zip(SIMILARITY_FEATURES, scales))
+        if row.style_category != target.style_category:
+            total += STYLE_MISMATCH_PENALTY
+        return total
+
+    ranked = sorted((distance(row), row.id) for row in rows if row.id != plan_id)
+    return [row_id for _, row_id in ranked[:k]]
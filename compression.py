@@ -0,0 +1,150 @@
+from flask import request
+import threading
+import time
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip only without it
+    brotli = None
+
+# Payload types worth compressing (JSON API responses, exports, plain text)
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/plain',
+                          'text/html', 'application/xml'}
+
+class ResponseCompressor:
+    """gzip/brotli compression of API responses, with ratio and CPU counters for tuning
+
+    Buffered responses below the size threshold are left alone. Streamed
+    responses are compressed chunk by chunk with a sync flush, so rows still
+    reach the client as they are produced.
+    """
+
+    def __init__(self, min_size=1024, level=6, brotli_quality=4, path_prefix='/api/'):
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.path_prefix = path_prefix
+        self._lock = threading.Lock()
+        self.compressed = 0
+        self.streamed = 0
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+        self.by_encoding = {'gzip': 0, 'br': 0}
+
+    def init_app(self, app):
+        """Read thresholds and levels from the app config and hook into every response"""
+        self.min_size = app.config.setdefault('COMPRESS_MIN_SIZE', self.min_size)
+        self.level = app.config.setdefault('COMPRESS_LEVEL', self.level)
+        self.brotli_quality = app.config.setdefault('COMPRESS_BROTLI_QUALITY', self.brotli_quality)
+        self.path_prefix = app.config.setdefault('COMPRESS_PATH_PREFIX', self.path_prefix)
+        app.after_request(self.compress_response)
+
+    def choose_encoding(self, accept_encodings):
+        if brotli is not None and accept_encodings['br'] > 0:
+            return 'br'
+        if accept_encodings['gzip'] > 0:
+            return 'gzip'
+        return None
+
+    def _compressor(self, encoding):
+        """Return (compress, flush, finish) callables for one response body"""
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            return compressor.process, compressor.flush, compressor.finish
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return (compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH),
+                lambda: compressor.flush(zlib.Z_FINISH))
+
+    def _record(self, encoding, bytes_in, bytes_out, cpu_seconds, streamed=False):
+        with self._lock:
+            self.compressed += 1
+            self.streamed += streamed
+            self.by_encoding[encoding] += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.cpu_seconds += cpu_seconds
+
+    def _skip(self):
+        with self._lock:
+            self.skipped += 1
+
+    def compress_response(self, response):
+        if not request.path.startswith(self.path_prefix):
+            return response
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES or request.method == 'HEAD'):
+            return response
+
+        encoding = self.choose_encoding(request.accept_encodings)
+        response.vary.add('Accept-Encoding')
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._compress_stream(response.iter_encoded(), encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                self._skip()
+                return response
+
+            started = time.thread_time()
+            compress, _, finish = self._compressor(encoding)
+            body = compress(data) + finish()
+            self._record(encoding, len(data), len(body), time.thread_time() - started)
+            response.set_data(body)
+
+        response.headers['Content-Encoding'] = encoding
+
+        # The compressed bytes differ, so a strong validator becomes a weak one
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+    def _compress_stream(self, chunks, encoding):
+        compress, flush, finish = self._compressor(encoding)
+        bytes_in = bytes_out = 0
+        cpu_seconds = 0.0
+        try:
+            for chunk in chunks:
+                started = time.thread_time()
+                body = compress(chunk) + flush()
+                cpu_seconds += time.thread_time() - started
+                bytes_in += len(chunk)
+                bytes_out += len(body)
+                if body:
+                    yield body
+            started = time.thread_time()
+            tail = finish()
+            cpu_seconds += time.thread_time() - started
+            bytes_out += len(tail)
+            if tail:
+                yield tail
+        finally:
+            self._record(encoding, bytes_in, bytes_out, cpu_seconds, streamed=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'min_size': self.min_size,
+                'level': self.level,
+                'brotli_quality': self.brotli_quality if brotli is not None else None,
+                'compressed': self.compressed,
+                'streamed': self.streamed,
+                'skipped_below_min_size': self.skipped,
+                'by_encoding': dict(self.by_encoding),
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'ratio': self.bytes_out / self.bytes_in if self.bytes_in else None,
+                'cpu_seconds': round(self.cpu_seconds, 6),
+                'cpu_ms_per_mb': round(self.cpu_seconds * 1000 / (self.bytes_in / 1048576), 3)
+                                 if self.bytes_in else None
+            }
+
+response_compressor = ResponseCompressor()
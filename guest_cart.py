@@ -0,0 +1,51 @@
+from flask import current_app, request
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+
+# Anonymous carts are kept client-side as a signed {plan_id: quantity} cookie,
+# so browsing guests never write cart rows; the cart is merged into CartItem
+# in one upsert when the guest signs in or places an order.
+
+GUEST_CART_COOKIE = 'guest_cart'
+
+GUEST_CART_SALT = 'guest-cart'
+
+class GuestCartFull(Exception):
+    """The guest cart would hold more plans than fit in its cookie"""
+
+def guest_serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=GUEST_CART_SALT)
+
+def resolve_cart_user(user_id):
+    """The cart owner for a request: None for a guest (no user_id while GUEST_CART is on), else a user id"""
+    if user_id is None:
+        return None if current_app.config['GUEST_CART'] else 1
+    return user_id
+
+def read_guest_cart():
+    """The guest cart cookie as {plan_id: quantity}; empty when missing, expired or tampered with"""
+    token = request.cookies.get(GUEST_CART_COOKIE)
+    if not token:
+        return {}
+    try:
+        pairs = guest_serializer().loads(token, max_age=current_app.config['GUEST_CART_MAX_AGE'])
+        return {int(plan_id): int(quantity) for plan_id, quantity in pairs if quantity > 0}
+    except (BadSignature, TypeError, ValueError):
+        return {}
+
+def save_guest_cart(response, quantities):
+    """Sign {plan_id: quantity} into the cookie, dropping emptied lines (deletes the cookie when empty)"""
+    pairs = sorted((plan_id, quantity) for plan_id, quantity in quantities.items() if quantity > 0)
+    if not pairs:
+        return clear_guest_cart(response)
+    if len(pairs) > current_app.config['GUEST_CART_MAX_ITEMS']:
+        raise GuestCartFull('Guest cart is full, sign in to add more plans')
+
+    response.set_cookie(GUEST_CART_COOKIE, guest_serializer().dumps(pairs),
+                        max_age=current_app.config['GUEST_CART_MAX_AGE'],
+                        httponly=True, samesite='Lax', secure=request.is_secure)
+    return response
+
+def clear_guest_cart(response):
+    if GUEST_CART_COOKIE in request.cookies:
+        response.delete_cookie(GUEST_CART_COOKIE, httponly=True, samesite='Lax', secure=request.is_secure)
+    return response
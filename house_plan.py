@@ -1,13 +1,35 @@
 from src.models.user import db
+from src.models.json_text import decode_json_text, encode_json_text
+from sqlalchemy import func, and_
+from sqlalchemy.orm import load_only, lazyload
 from datetime import datetime
-import json
 
 # Association table for many-to-many relationship between plans and categories
 plan_categories = db.Table('plan_categories',
     db.Column('plan_id', db.Integer, db.ForeignKey('house_plan.id'), primary_key=True),
-    db.Column('category_id', db.Integer, db.ForeignKey('category.id'), primary_key=True)
+    db.Column('category_id', db.Integer, db.ForeignKey('category.id'), primary_key=True),
+    db.Index('ix_plan_categories_category', 'category_id', 'plan_id')
 )
 
+# Fields every new house plan must provide (single create and bulk import)
+REQUIRED_PLAN_FIELDS = ('title', 'description', 'price', 'bedrooms', 'bathrooms', 'stories',
+                        'square_footage', 'style_category')
+
+# Plan fields that admins can change after creation
+UPDATABLE_PLAN_FIELDS = ('title', 'description', 'price', 'bedrooms', 'bathrooms', 'stories',
+                         'garage_spaces', 'square_footage', 'style_category', 'featured_image_url',
+                         'is_featured', 'is_active')
+
+# Column-backed plan fields that list endpoints can request with ?fields=
+PLAN_FIELDS = ('id', 'title', 'description', 'price', 'bedrooms', 'bathrooms', 'stories',
+               'garage_spaces', 'square_footage', 'style_category', 'featured_image_url',
+               'gallery_images', 'gallery_media', 'plan_files', 'is_featured', 'is_active', 'created_at',
+               'updated_at')
+
+# Fields returned by ?view=summary (plan cards in listings and the cart)
+PLAN_SUMMARY_FIELDS = ('id', 'title', 'price', 'bedrooms', 'bathrooms', 'stories', 'garage_spaces',
+                       'square_footage', 'style_category', 'featured_image_url', 'is_featured')
+
 class HousePlan(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -21,16 +43,33 @@ class HousePlan(db.Model):
     style_category = db.Column(db.String(100), nullable=False)
     featured_image_url = db.Column(db.String(500))
     gallery_images = db.Column(db.Text)  # JSON string of image URLs
+    gallery_media = db.Column(db.Text)  # JSON list of uploaded image entries (hash, size, derivatives)
     plan_files = db.Column(db.Text)  # JSON string of file URLs (PDF, DWG)
+    stored_plan_files = db.Column(db.Text)  # JSON list of uploaded {name, sha256, size}; private, never listed
     is_featured = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
+    # Partial indexes over active plans for the hot listing filters and sorts
+    __table_args__ = (
+        db.Index('ix_house_plan_listing', 'is_featured', 'created_at', 'id',
+                 sqlite_where=is_active == True, postgresql_where=is_active == True),
+        db.Index('ix_house_plan_featured', 'created_at',
+                 sqlite_where=and_(is_active == True, is_featured == True),
+                 postgresql_where=and_(is_active == True, is_featured == True)),
+        db.Index('ix_house_plan_price', 'price',
+                 sqlite_where=is_active == True, postgresql_where=is_active == True),
+        db.Index('ix_house_plan_bedrooms', 'bedrooms', 'bathrooms',
+                 sqlite_where=is_active == True, postgresql_where=is_active == True),
+        db.Index('ix_house_plan_style', 'style_category',
+                 sqlite_where=is_active == True, postgresql_where=is_active == True),
+    )
+    
     # Relationships
     categories = db.relationship('Category', secondary=plan_categories, lazy='subquery',
-                               backref=db.backref('plans', lazy=True))
+                               order_by='Category.id', backref=db.backref('plans', lazy=True))
     creator = db.relationship('User', backref=db.backref('created_plans', lazy=True))
     
     def __repr__(self):
@@ -38,29 +77,76 @@ class HousePlan(db.Model):
     
     def get_gallery_images(self):
         """Parse gallery images JSON string"""
-        if self.gallery_images:
-            try:
-                return json.loads(self.gallery_images)
-            except json.JSONDecodeError:
-                return []
-        return []
+        return decode_json_text(self, 'gallery_images', list)
     
     def set_gallery_images(self, images_list):
         """Set gallery images as JSON string"""
-        self.gallery_images = json.dumps(images_list)
+        encode_json_text(self, 'gallery_images', images_list)
+    
+    def get_gallery_media(self):
+        """Parse the uploaded image entries JSON string"""
+        return decode_json_text(self, 'gallery_media', list)
+    
+    def set_gallery_media(self, media_list):
+        """Set the uploaded image entries as JSON string"""
+        encode_json_text(self, 'gallery_media', media_list)
     
     def get_plan_files(self):
         """Parse plan files JSON string"""
-        if self.plan_files:
-            try:
-                return json.loads(self.plan_files)
-            except json.JSONDecodeError:
-                return []
-        return []
+        return decode_json_text(self, 'plan_files', list)
     
     def set_plan_files(self, files_list):
         """Set plan files as JSON string"""
-        self.plan_files = json.dumps(files_list)
+        encode_json_text(self, 'plan_files', files_list)
+    
+    def get_stored_plan_files(self):
+        """Parse the uploaded plan files JSON string"""
+        return decode_json_text(self, 'stored_plan_files', list)
+    
+    def set_stored_plan_files(self, files_list):
+        """Set the uploaded plan files as JSON string"""
+        encode_json_text(self, 'stored_plan_files', files_list)
+    
+    @staticmethod
+    def resolve_fields(view=None, fields=None):
+        """Work out the projected fields for a list request (None means the full view)"""
+        if fields:
+            requested = [field.strip() for field in fields.split(',') if field.strip()]
+            for field in requested:
+                if field not in PLAN_FIELDS:
+                    raise ValueError(f'Unknown field: {field}')
+            return ['id'] + [field for field in requested if field != 'id']
+        if view == 'summary':
+            return list(PLAN_SUMMARY_FIELDS)
+        if view and view != 'full':
+            raise ValueError(f'Unknown view: {view}')
+        return None
+    
+    @classmethod
+    def projection_options(cls, fields):
+        """Loader options that select only the given columns and skip relationship loads"""
+        return [
+            load_only(*[getattr(cls, field) for field in fields]),
+            lazyload(cls.categories),
+            lazyload(cls.creator)
+        ]
+    
+    def to_summary_dict(self, fields=PLAN_SUMMARY_FIELDS):
+        """Serialize only the given column fields"""
+        data = {}
+        for field in fields:
+            if field == 'gallery_images':
+                data[field] = self.get_gallery_images()
+            elif field == 'gallery_media':
+                data[field] = self.get_gallery_media()
+            elif field == 'plan_files':
+                data[field] = self.get_plan_files()
+            elif field in ('created_at', 'updated_at'):
+                value = getattr(self, field)
+                data[field] = value.isoformat() if value else None
+            else:
+                data[field] = getattr(self, field)
+        return data
     
     def to_dict(self):
         return {
@@ -76,6 +162,7 @@ class HousePlan(db.Model):
             'style_category': self.style_category,
             'featured_image_url': self.featured_image_url,
             'gallery_images': self.get_gallery_images(),
+            'gallery_media': self.get_gallery_media(),
             'plan_files': self.get_plan_files(),
             'is_featured': self.is_featured,
             'is_active': self.is_active,
@@ -97,6 +184,37 @@ class Category(db.Model):
     def __repr__(self):
         return f'<Category {self.name}>'
     
+    @classmethod
+    def plan_counts_query(cls):
+        """Query active categories with their active plan counts"""
+        return db.session.query(cls, func.count(HousePlan.id))\
+                         .outerjoin(plan_categories, plan_categories.c.category_id == cls.id)\
+                         .outerjoin(HousePlan, and_(HousePlan.id == plan_categories.c.plan_id,
+                                                    HousePlan.is_active == True))\
+                         .filter(cls.is_active == True)\
+                         .group_by(cls.id)\
+                         .order_by(cls.name)
+    
+    @classmethod
+    def active_with_plan_counts(cls):
+        """Get active categories with their active plan counts in a single query"""
+        categories = []
+        for category, plan_count in cls.plan_counts_query().all():
+            category._plan_count = plan_count
+            categories.append(category)
+        return categories
+    
+    def get_plan_count(self):
+        """Count active plans in this category without loading them"""
+        plan_count = getattr(self, '_plan_count', None)
+        if plan_count is None:
+            plan_count = db.session.query(func.count(HousePlan.id))\
+                                   .join(plan_categories, plan_categories.c.plan_id == HousePlan.id)\
+                                   .filter(plan_categories.c.category_id == self.id,
+                                           HousePlan.is_active == True).scalar() if self.id else 0
+            self._plan_count = plan_count
+        return plan_count
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -106,6 +224,6 @@ class Category(db.Model):
             'image_url': self.image_url,
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'plan_count': len(self.plans) if hasattr(self, 'plans') else 0
+            'plan_count': self.get_plan_count()
         }
 
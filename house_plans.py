@@ -1,76 +1,207 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app, send_from_directory
 from src.models.user import db
-from src.models.house_plan import HousePlan, Category
-from sqlalchemy import or_, and_
+from src.models.house_plan import HousePlan, Category, REQUIRED_PLAN_FIELDS, UPDATABLE_PLAN_FIELDS
+from src.models.search import search_enabled, build_match_query, search_subquery
+from src.models.catalog import bump_catalog_version, get_catalog_version
+from src.models.catalog_engine import catalog_engine, similar_plans_fallback
+from src.models.upload import FileUpload, MediaImage
+from src.models.serializers import serialize_plans
+from src.routes.pagination import keyset_paginate, page_bounds, page_info
+from src.routes.http_cache import conditional_get
+from src.routes.response_cache import response_cache, cached_response
+from src.routes.compression import response_compressor
+from src.routes.plan_import import import_plans, IMPORT_FORMATS
+from src.routes.plan_export import export_plans, EXPORT_FORMATS
+from src.routes.plan_images import (image_pipeline, store_original, image_entry, attach_plan_image,
+                                    refresh_plan_image, media_url, IMAGE_EXTENSIONS)
+from src.routes.plan_uploads import (start_upload, write_chunk, finish_upload, discard_upload, upload_offset,
+                                     expire_uploads, plan_file_entry, attach_plan_file, UploadConflict,
+                                     PLAN_FILE_EXTENSIONS, MAX_PLAN_FILE_SIZE, UPLOAD_CHUNK_SIZE)
+from sqlalchemy import or_, and_, false, func, select, update
+from sqlalchemy.orm import aliased
+from collections import Counter
+import codecs
+import math
 import os
 from werkzeug.utils import secure_filename
+from werkzeug.datastructures import MultiDict
 
 house_plans_bp = Blueprint('house_plans', __name__)
 
 # Allowed file extensions for uploads
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'pdf', 'dwg'}
 
+# Price buckets (ZAR) for the price facet, upper bound exclusive
+PRICE_BUCKETS = [(0, 1000), (1000, 2000), (2000, 3000), (3000, 5000), (5000, None)]
+
+# Uploaded media is content-addressed, so it can be cached for a year
+MEDIA_MAX_AGE = 365 * 24 * 3600
+
+# Columns loaded for full-view list pages, which are serialized from row tuples (sorting and cursor keys)
+PLAN_KEY_FIELDS = ['id', 'is_featured', 'created_at']
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def plan_cache_state(plan):
+    """Snapshot the plan attributes that cached catalog routes depend on"""
+    return {
+        'is_featured': bool(plan.is_featured),
+        'is_active': bool(plan.is_active),
+        'style_category': plan.style_category
+    }
+
+def invalidate_plan_caches(plan, before=None):
+    """Drop cached catalog responses and refresh in-memory indexes affected by a committed plan write"""
+    after = plan_cache_state(plan)
+    before = before or {'is_featured': False, 'is_active': False, 'style_category': None}
+    
+    # Facet counts and similar-plan rankings depend on every plan attribute
+    endpoints = {'house_plans.get_house_plan_facets', 'house_plans.get_similar_plans'}
+    
+    if before['is_featured'] or after['is_featured']:
+        endpoints.add('house_plans.get_featured_plans')
+    
+    if before['style_category'] != after['style_category'] or before['is_active'] != after['is_active']:
+        endpoints.add('house_plans.get_styles')
+    
+    # Plan counts show up in /categories and in every serialized plan's categories
+    if before['is_active'] != after['is_active'] and plan.categories:
+        endpoints.update(['house_plans.get_categories', 'house_plans.get_featured_plans'])
+    
+    response_cache.invalidate(*endpoints)
+    
+    if catalog_engine.enabled:
+        version, _ = get_catalog_version()
+        catalog_engine.plan_changed(plan, version)
+
+def serialize_plan_page(plans, fields):
+    """Serialize a page of plans: projected fields per plan, the full view through the batched serializer"""
+    if fields is not None:
+        return [plan.to_summary_dict(fields) for plan in plans]
+    return serialize_plans([plan.id for plan in plans])
+
+def filter_plans_query(query, args):
+    """Apply the /house-plans filter params to a plan query, returning (query, search ranking)"""
+    search = args.get('search', '')
+    category = args.get('category', '')
+    style = args.get('style', '')
+    min_price = args.get('min_price', type=float)
+    max_price = args.get('max_price', type=float)
+    bedrooms = args.get('bedrooms', type=int)
+    bathrooms = args.get('bathrooms', type=float)
+    featured_only = args.get('featured', 'false').lower() == 'true'
+    
+    ranking = None
+    if search and search_enabled():
+        match = build_match_query(search)
+        if match is None:
+            query = query.filter(false())
+        else:
+            ranking = search_subquery(match)
+            query = query.join(ranking, ranking.c.rowid == HousePlan.id)
+    elif search:
+        query = query.filter(or_(
+            HousePlan.title.contains(search),
+            HousePlan.description.contains(search),
+            HousePlan.style_category.contains(search)
+        ))
+    
+    if category:
+        query = query.join(HousePlan.categories).filter(Category.slug == category)
+    
+    if style:
+        query = query.filter(HousePlan.style_category.ilike(f'%{style}%'))
+    
+    if min_price is not None:
+        query = query.filter(HousePlan.price >= min_price)
+    
+    if max_price is not None:
+        query = query.filter(HousePlan.price <= max_price)
+    
+    if bedrooms is not None:
+        query = query.filter(HousePlan.bedrooms == bedrooms)
+    
+    if bathrooms is not None:
+        query = query.filter(HousePlan.bathrooms == bathrooms)
+    
+    if featured_only:
+        query = query.filter(HousePlan.is_featured == True)
+    
+    return query, ranking
+
 @house_plans_bp.route('/house-plans', methods=['GET'])
+@conditional_get
 def get_house_plans():
     """Get all house plans with optional filtering"""
     try:
         # Get query parameters
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 12, type=int)
-        search = request.args.get('search', '')
-        category = request.args.get('category', '')
-        style = request.args.get('style', '')
-        min_price = request.args.get('min_price', type=float)
-        max_price = request.args.get('max_price', type=float)
-        bedrooms = request.args.get('bedrooms', type=int)
-        bathrooms = request.args.get('bathrooms', type=float)
-        featured_only = request.args.get('featured', 'false').lower() == 'true'
-        
-        # Build query
-        query = HousePlan.query.filter(HousePlan.is_active == True)
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
         
-        # Apply filters
-        if search:
-            query = query.filter(or_(
-                HousePlan.title.contains(search),
-                HousePlan.description.contains(search),
-                HousePlan.style_category.contains(search)
-            ))
+        try:
+            fields = HousePlan.resolve_fields(request.args.get('view'), request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        if category:
-            query = query.join(HousePlan.categories).filter(Category.slug == category)
+        # Build query (full-view rows are serialized later, from row tuples)
+        query = HousePlan.query.filter(HousePlan.is_active == True)\
+                               .options(*HousePlan.projection_options(fields or PLAN_KEY_FIELDS))
         
-        if style:
-            query = query.filter(HousePlan.style_category.ilike(f'%{style}%'))
+        # Answer simple filter/sort/page requests from the in-memory engine when enabled
+        if cursor is None and catalog_engine.enabled and catalog_engine.supports(request.args):
+            # Out-of-range page/per_page are clamped the way paginate() clamps them below
+            plan_ids, total = catalog_engine.query(request.args, *page_bounds(page, per_page))
+            plans = catalog_engine.hydrate(query, plan_ids)
+            
+            return jsonify({
+                'success': True,
+                'data': serialize_plan_page(plans, fields),
+                'pagination': page_info(page, per_page, total)
+            })
         
-        if min_price is not None:
-            query = query.filter(HousePlan.price >= min_price)
-        
-        if max_price is not None:
-            query = query.filter(HousePlan.price <= max_price)
-        
-        if bedrooms is not None:
-            query = query.filter(HousePlan.bedrooms == bedrooms)
-        
-        if bathrooms is not None:
-            query = query.filter(HousePlan.bathrooms == bathrooms)
-        
-        if featured_only:
-            query = query.filter(HousePlan.is_featured == True)
+        # Apply filters
+        query, ranking = filter_plans_query(query, request.args)
         
-        # Order by featured first, then by created date
+        # Order by search relevance when searching, then featured first, then by created date
+        if ranking is not None:
+            query = query.order_by(ranking.c.rank)
         query = query.order_by(HousePlan.is_featured.desc(), HousePlan.created_at.desc())
         
+        # Keyset pagination when a cursor is given (empty cursor for the first page)
+        if cursor is not None:
+            keys = [(HousePlan.is_featured, True), (HousePlan.created_at, True), (HousePlan.id, True)]
+            if ranking is not None:
+                keys.insert(0, (ranking.c.rank, False))
+            
+            try:
+                plans, next_cursor = keyset_paginate(query, keys, cursor, per_page)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            
+            pagination_info = {
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
+            }
+            if include_total:
+                pagination_info['total'] = query.order_by(None).count()
+            
+            return jsonify({
+                'success': True,
+                'data': serialize_plan_page(plans, fields),
+                'pagination': pagination_info
+            })
+        
         # Paginate
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         plans = pagination.items
         
         return jsonify({
             'success': True,
-            'data': [plan.to_dict() for plan in plans],
+            'data': serialize_plan_page(plans, fields),
             'pagination': {
                 'page': page,
                 'per_page': per_page,
@@ -84,17 +215,142 @@ def get_house_plans():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Every cached catalog endpoint, for writes that touch many plans at once
+CATALOG_CACHE_ENDPOINTS = (
+    'house_plans.get_featured_plans',
+    'house_plans.get_styles',
+    'house_plans.get_categories',
+    'house_plans.get_house_plan_facets',
+    'house_plans.get_similar_plans'
+)
+
+def invalidate_catalog_caches():
+    """Drop every cached catalog response and in-memory index after a bulk write"""
+    response_cache.invalidate(*CATALOG_CACHE_ENDPOINTS)
+    catalog_engine.invalidate()
+
+def price_bucket(price):
+    """Find the PRICE_BUCKETS entry a price falls into"""
+    for lower, upper in PRICE_BUCKETS:
+        if price >= lower and (upper is None or price < upper):
+            return lower, upper
+    return None
+
+@house_plans_bp.route('/house-plans/facets', methods=['GET'])
+@conditional_get
+@cached_response
+def get_house_plan_facets():
+    """Get facet counts for the plans matching the /house-plans filters"""
+    try:
+        facet_category = aliased(Category)
+        
+        # One row per (plan, category) so every facet comes from a single scan
+        query = db.session.query(
+            HousePlan.id, HousePlan.bedrooms, HousePlan.bathrooms, HousePlan.stories,
+            HousePlan.style_category, HousePlan.price, facet_category.slug, facet_category.name
+        ).filter(HousePlan.is_active == True)
+        query, _ = filter_plans_query(query, request.args)
+        query = query.outerjoin(HousePlan.categories.of_type(facet_category).and_(facet_category.is_active == True))
+        
+        seen = set()
+        bedrooms, bathrooms, stories, styles, prices = Counter(), Counter(), Counter(), Counter(), Counter()
+        categories, category_names = Counter(), {}
+        
+        for plan_id, plan_bedrooms, plan_bathrooms, plan_stories, style, price, slug, name in query:
+            if slug:
+                categories[slug] += 1
+                category_names[slug] = name
+            
+            if plan_id in seen:
+                continue
+            seen.add(plan_id)
+            
+            bedrooms[plan_bedrooms] += 1
+            bathrooms[plan_bathrooms] += 1
+            stories[plan_stories] += 1
+            if style:
+                styles[style] += 1
+            bucket = price_bucket(price)
+            if bucket:
+                prices[bucket] += 1
+        
+        def histogram(counter):
+            return [{'value': value, 'count': count} for value, count in sorted(counter.items())]
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'total': len(seen),
+                'facets': {
+                    'bedrooms': histogram(bedrooms),
+                    'bathrooms': histogram(bathrooms),
+                    'stories': histogram(stories),
+                    'style_category': histogram(styles),
+                    'category': [
+                        {'value': slug, 'name': category_names[slug], 'count': count}
+                        for slug, count in sorted(categories.items())
+                    ],
+                    'price': [
+                        {
+                            'min': lower,
+                            'max': upper,
+                            'label': f'{lower}-{upper}' if upper is not None else f'{lower}+',
+                            'count': prices[(lower, upper)]
+                        }
+                        for lower, upper in PRICE_BUCKETS
+                    ]
+                }
+            }
+        })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @house_plans_bp.route('/house-plans/<int:plan_id>', methods=['GET'])
+@conditional_get
 def get_house_plan(plan_id):
     """Get a specific house plan by ID"""
     try:
-        plan = HousePlan.query.filter_by(id=plan_id, is_active=True).first()
-        if not plan:
+        plans = serialize_plans([plan_id])
+        if not plans or not plans[0]['is_active']:
+            return jsonify({'success': False, 'error': 'House plan not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'data': plans[0]
+        })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@house_plans_bp.route('/house-plans/<int:plan_id>/similar', methods=['GET'])
+@conditional_get
+@cached_response
+def get_similar_plans(plan_id):
+    """Get the plans closest to a plan in size, layout, price and style"""
+    try:
+        limit = min(max(request.args.get('limit', 6, type=int), 1), 50)
+        
+        try:
+            fields = HousePlan.resolve_fields(request.args.get('view'), request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        if catalog_engine.enabled:
+            plan_ids = catalog_engine.similar(plan_id, limit)
+        else:
+            plan_ids = similar_plans_fallback(plan_id, limit)
+        
+        if plan_ids is None:
             return jsonify({'success': False, 'error': 'House plan not found'}), 404
         
+        query = HousePlan.query.filter(HousePlan.is_active == True)\
+                               .options(*HousePlan.projection_options(fields or PLAN_KEY_FIELDS))
+        plans = catalog_engine.hydrate(query, plan_ids)
+        
         return jsonify({
             'success': True,
-            'data': plan.to_dict()
+            'data': serialize_plan_page(plans, fields)
         })
     
     except Exception as e:
@@ -107,8 +363,7 @@ def create_house_plan():
         data = request.get_json()
         
         # Validate required fields
-        required_fields = ['title', 'description', 'price', 'bedrooms', 'bathrooms', 'stories', 'square_footage', 'style_category']
-        for field in required_fields:
+        for field in REQUIRED_PLAN_FIELDS:
             if field not in data:
                 return jsonify({'success': False, 'error': f'Missing required field: {field}'}), 400
         
@@ -131,13 +386,17 @@ def create_house_plan():
         # Set gallery images and plan files if provided
         if 'gallery_images' in data:
             plan.set_gallery_images(data['gallery_images'])
+            attach_uploaded_images(plan)
         
         if 'plan_files' in data:
             plan.set_plan_files(data['plan_files'])
         
         db.session.add(plan)
+        bump_catalog_version()
         db.session.commit()
         
+        invalidate_plan_caches(plan)
+        
         return jsonify({
             'success': True,
             'data': plan.to_dict(),
@@ -148,6 +407,77 @@ def create_house_plan():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@house_plans_bp.route('/house-plans/import', methods=['POST'])
+def import_house_plans():
+    """Bulk import house plans from a streamed CSV or NDJSON body (Admin only)"""
+    try:
+        dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+        batch_size = min(max(request.args.get('batch_size', 500, type=int), 1), 5000)
+        
+        created_by = request.args.get('created_by', type=int)
+        if created_by is None:
+            return jsonify({'success': False, 'error': 'created_by is required'}), 400
+        
+        # Accept a multipart file upload or the raw request body
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        filename = upload.filename if upload else ''
+        
+        import_format = request.args.get('format', '').lower()
+        if not import_format:
+            if filename.lower().endswith('.csv') or request.mimetype == 'text/csv':
+                import_format = 'csv'
+            else:
+                import_format = 'ndjson'
+        
+        if import_format not in IMPORT_FORMATS:
+            return jsonify({'success': False, 'error': f'Unsupported import format: {import_format}'}), 400
+        
+        try:
+            report = import_plans(codecs.getreader('utf-8')(stream), import_format, created_by,
+                                  dry_run=dry_run, batch_size=batch_size)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        if report['imported'] and not dry_run:
+            invalidate_catalog_caches()
+        
+        return jsonify({
+            'success': True,
+            'data': report,
+            'message': 'Dry run completed' if dry_run else f"Imported {report['imported']} house plans"
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@house_plans_bp.route('/house-plans/export', methods=['GET'])
+def export_house_plans():
+    """Stream the full active catalog as NDJSON or CSV"""
+    try:
+        export_format = request.args.get('format', 'ndjson').lower()
+        compress = request.args.get('gzip', 'false').lower() == 'true'
+        
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'success': False, 'error': f'Unsupported export format: {export_format}'}), 400
+        
+        filename = f'house-plans.{export_format}' + ('.gz' if compress else '')
+        if compress:
+            mimetype = 'application/gzip'
+        elif export_format == 'csv':
+            mimetype = 'text/csv'
+        else:
+            mimetype = 'application/x-ndjson'
+        
+        response = Response(stream_with_context(export_plans(export_format, compress=compress)),
+                            mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+        return response
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @house_plans_bp.route('/house-plans/<int:plan_id>', methods=['PUT'])
 def update_house_plan(plan_id):
     """Update a house plan (Admin only)"""
@@ -157,25 +487,26 @@ def update_house_plan(plan_id):
             return jsonify({'success': False, 'error': 'House plan not found'}), 404
         
         data = request.get_json()
+        before = plan_cache_state(plan)
         
         # Update fields
-        updatable_fields = ['title', 'description', 'price', 'bedrooms', 'bathrooms', 'stories', 
-                           'garage_spaces', 'square_footage', 'style_category', 'featured_image_url', 
-                           'is_featured', 'is_active']
-        
-        for field in updatable_fields:
+        for field in UPDATABLE_PLAN_FIELDS:
             if field in data:
                 setattr(plan, field, data[field])
         
         # Update gallery images and plan files if provided
         if 'gallery_images' in data:
             plan.set_gallery_images(data['gallery_images'])
+            attach_uploaded_images(plan)
         
         if 'plan_files' in data:
             plan.set_plan_files(data['plan_files'])
         
+        bump_catalog_version()
         db.session.commit()
         
+        invalidate_plan_caches(plan, before)
+        
         return jsonify({
             'success': True,
             'data': plan.to_dict(),
@@ -186,6 +517,196 @@ def update_house_plan(plan_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Filters /house-plans/bulk accepts and the type each value must parse as
+BULK_FILTER_TYPES = {
+    'search': str,
+    'category': str,
+    'style': str,
+    'min_price': float,
+    'max_price': float,
+    'bedrooms': int,
+    'bathrooms': float,
+    'featured': bool,
+    'include_inactive': bool,
+}
+
+def parse_filter_value(key, value, expected):
+    """Coerce one bulk filter value, raising ValueError for anything that does not parse"""
+    if expected is bool:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.strip().lower() in ('true', 'false'):
+            return value.strip().lower() == 'true'
+    elif expected is str:
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    elif isinstance(value, (int, float, str)) and not isinstance(value, bool):
+        try:
+            number = float(value)
+        except ValueError:
+            number = None
+        if number is not None and math.isfinite(number) and (expected is float or number.is_integer()):
+            return expected(number)
+    raise ValueError(f'Invalid value for filter {key}: {value!r}')
+
+def parse_bulk_filter(raw):
+    """Validate a bulk filter into (filter args for filter_plans_query, featured, include_inactive)
+
+    filter_plans_query skips unknown keys and values it cannot parse, which would
+    widen a bulk write to the whole catalog, so both are rejected here; {} is the
+    only way to target every plan. featured=false selects the non-featured plans.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError('Filter must be an object')
+    
+    unknown = sorted(set(raw) - set(BULK_FILTER_TYPES))
+    if unknown:
+        raise ValueError(f"Unknown filter: {', '.join(unknown)}")
+    
+    values = {key: parse_filter_value(key, value, BULK_FILTER_TYPES[key]) for key, value in raw.items()}
+    featured = values.pop('featured', None)
+    include_inactive = values.pop('include_inactive', False)
+    if featured:
+        values['featured'] = 'true'
+    return MultiDict({key: str(value) for key, value in values.items()}), featured, include_inactive
+
+# Bounds for bulk price changes (ZAR): no plan may end up negative or above MAX_PLAN_PRICE
+MAX_PLAN_PRICE = 10_000_000
+MAX_PRICE_ADJUSTMENT_PERCENT = 1000
+
+def parse_price_adjustment(adjustment):
+    """Validate {"percent": n} or {"amount": n} into (factor, offset), the new price being price * factor + offset
+
+    Raises ValueError for anything but a finite JSON number within bounds; a
+    percent below -100 would turn prices negative whatever they are.
+    """
+    if not isinstance(adjustment, dict) or len(adjustment) != 1 or not set(adjustment) & {'percent', 'amount'}:
+        raise ValueError('price_adjustment needs exactly one of percent or amount')
+    
+    (kind, number), = adjustment.items()
+    if isinstance(number, bool) or not isinstance(number, (int, float)) or not math.isfinite(number):
+        raise ValueError(f'price_adjustment {kind} must be a finite number')
+    
+    if kind == 'percent':
+        if not -100 <= number <= MAX_PRICE_ADJUSTMENT_PERCENT:
+            raise ValueError(f'price_adjustment percent must be between -100 and {MAX_PRICE_ADJUSTMENT_PERCENT}')
+        return 1 + number / 100, 0
+    
+    if abs(number) > MAX_PLAN_PRICE:
+        raise ValueError(f'price_adjustment amount must be within {MAX_PLAN_PRICE}')
+    return 1, number
+
+def check_column_value(field, value):
+    """Raise ValueError unless a value fits the plan column's type, length and nullability"""
+    column = HousePlan.__table__.c[field]
+    if value is None:
+        if column.nullable:
+            return
+        raise ValueError(f'{field} cannot be null')
+    
+    expected = column.type.python_type
+    if expected is bool:
+        valid = isinstance(value, bool)
+    elif expected is int:
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    elif expected is float:
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+    else:
+        valid = isinstance(value, str) and (column.type.length is None or len(value) <= column.type.length)
+    
+    if not valid or (field == 'price' and not 0 <= value <= MAX_PLAN_PRICE):
+        raise ValueError(f'Invalid value for {field}: {value!r}')
+
+@house_plans_bp.route('/house-plans/bulk', methods=['POST'])
+def bulk_update_house_plans():
+    """Update or soft-delete every plan matching a filter in one statement (Admin only)"""
+    try:
+        data = request.get_json()
+        
+        if 'filter' not in data:
+            return jsonify({'success': False, 'error': 'Filter is required (use {} for all plans)'}), 400
+        
+        # Unknown keys or unparseable values raise instead of silently matching every plan
+        filters, featured, include_inactive = parse_bulk_filter(data['filter'])
+        patch = data.get('patch', {})
+        price_adjustment = data.get('price_adjustment')
+        
+        if not isinstance(patch, dict):
+            return jsonify({'success': False, 'error': 'Patch must be an object'}), 400
+        
+        for field, value in patch.items():
+            if field not in UPDATABLE_PLAN_FIELDS:
+                return jsonify({'success': False, 'error': f'Field cannot be bulk updated: {field}'}), 400
+            check_column_value(field, value)
+        
+        values = {getattr(HousePlan, field): value for field, value in patch.items()}
+        
+        if data.get('deactivate'):
+            values[HousePlan.is_active] = False
+        
+        # Price expressions: {"percent": 8} for +8%, {"amount": -100} for R100 off
+        adjustment = None
+        if price_adjustment is not None:
+            if 'price' in patch:
+                return jsonify({'success': False, 'error': 'Use either patch.price or price_adjustment'}), 400
+            factor, offset = adjustment = parse_price_adjustment(price_adjustment)
+            values[HousePlan.price] = func.round(HousePlan.price * factor + offset, 2)
+        
+        if not values:
+            return jsonify({'success': False, 'error': 'Nothing to update'}), 400
+        
+        # Plans matching the same filters as /house-plans (inactive ones only on request)
+        query = db.session.query(HousePlan.id)
+        if not include_inactive:
+            query = query.filter(HousePlan.is_active == True)
+        query, _ = filter_plans_query(query, filters)
+        if featured is False:
+            query = query.filter(HousePlan.is_featured == False)
+        matching = query.subquery()
+        
+        # Adjustments are monotonic, so the cheapest and dearest matching plans bound every new price
+        if adjustment is not None:
+            low, high = db.session.query(func.min(HousePlan.price), func.max(HousePlan.price))\
+                                  .filter(HousePlan.id.in_(select(matching.c.id))).one()
+            factor, offset = adjustment
+            if low is not None and (round(low * factor + offset, 2) < 0 or
+                                    round(high * factor + offset, 2) > MAX_PLAN_PRICE):
+                return jsonify({'success': False,
+                                'error': f'price_adjustment would move prices outside 0 to {MAX_PLAN_PRICE}'}), 400
+        
+        result = db.session.execute(
+            update(HousePlan)
+            .where(HousePlan.id.in_(select(matching.c.id)))
+            .values(values)
+            .returning(HousePlan.id)
+            .execution_options(synchronize_session=False)
+        )
+        affected_ids = sorted(row[0] for row in result)
+        
+        if affected_ids:
+            bump_catalog_version()
+        db.session.commit()
+        
+        if affected_ids:
+            invalidate_catalog_caches()
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'affected': len(affected_ids),
+                'affected_ids': affected_ids
+            },
+            'message': f'{len(affected_ids)} house plans updated successfully'
+        })
+    
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': f'Invalid bulk update: {e}'}), 400
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @house_plans_bp.route('/house-plans/<int:plan_id>', methods=['DELETE'])
 def delete_house_plan(plan_id):
     """Delete a house plan (Admin only)"""
@@ -195,9 +716,13 @@ def delete_house_plan(plan_id):
             return jsonify({'success': False, 'error': 'House plan not found'}), 404
         
         # Soft delete by setting is_active to False
+        before = plan_cache_state(plan)
         plan.is_active = False
+        bump_catalog_version()
         db.session.commit()
         
+        invalidate_plan_caches(plan, before)
+        
         return jsonify({
             'success': True,
             'message': 'House plan deleted successfully'
@@ -207,11 +732,302 @@ def delete_house_plan(plan_id):
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+# Tries at a conditional plan media write before giving up
+PLAN_MEDIA_WRITE_ATTEMPTS = 5
+
+def update_plan_media(plan_id, change, fields):
+    """Apply change(plan) to the given columns, committing only if nobody else changed them meanwhile
+
+    The pool callback thread and request handlers both rewrite a plan's JSON
+    media lists. The row is read FOR UPDATE (a row lock where the database
+    has them) and written with an UPDATE conditioned on every field still
+    holding what was read, so a concurrent write is retried on fresh data
+    instead of being overwritten. Returns the plan, or None if it does not exist.
+    """
+    for _ in range(PLAN_MEDIA_WRITE_ATTEMPTS):
+        plan = db.session.get(HousePlan, plan_id, with_for_update=True, populate_existing=True)
+        if not plan:
+            return None
+        
+        before = plan_cache_state(plan)
+        read = {field: getattr(plan, field) for field in fields}
+        change(plan)
+        values = {field: getattr(plan, field) for field in fields}
+        
+        # Written by the conditional UPDATE below, not by the unit of work
+        db.session.expire(plan)
+        written = db.session.execute(
+            update(HousePlan)
+            .where(HousePlan.id == plan_id,
+                   *[getattr(HousePlan, field).is_not_distinct_from(value) for field, value in read.items()])
+            .values(values)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        
+        if written:
+            bump_catalog_version()
+            db.session.commit()
+            invalidate_plan_caches(plan, before)
+            return plan
+        db.session.rollback()
+    
+    raise RuntimeError(f'House plan {plan_id} kept changing, media update abandoned')
+
+def record_plan_image(plan_id, entry):
+    """Attach an uploaded image entry to a plan and refresh the caches that show it"""
+    return update_plan_media(plan_id, lambda plan: attach_plan_image(plan, entry),
+                             ('gallery_images', 'gallery_media', 'featured_image_url'))
+
+def attach_uploaded_images(plan):
+    """Match the plan's uploaded image entries to its gallery URLs, in gallery order
+
+    Entries of URLs no longer listed are dropped, and URLs of images uploaded
+    without a plan pick up their stored entry (with derivatives if rendered).
+    """
+    images = plan.get_gallery_images()
+    position = {url: index for index, url in enumerate(images) if isinstance(url, str)}
+    media = [image for image in plan.get_gallery_media() if image['url'] in position]
+    
+    missing = set(position) - {image['url'] for image in media}
+    if missing:
+        media.extend(image.to_entry() for image in MediaImage.query.filter(MediaImage.url.in_(missing)))
+    
+    media.sort(key=lambda image: position[image['url']])
+    plan.set_gallery_media(media)
+
+def derivatives_ready(app, plan_id, entry):
+    """Pool callback that stores finished derivatives and records them on every plan showing the image"""
+    def record(rendered, error=None):
+        if error is not None:
+            app.logger.error('Image derivatives failed for %s: %s', entry['sha256'], error)
+            return
+        with app.app_context():
+            try:
+                rendered_entry = image_entry(entry['sha256'], entry['url'], rendered,
+                                             featured=entry.get('featured', False))
+                MediaImage.save(rendered_entry)
+                db.session.commit()
+                
+                if plan_id is not None:
+                    record_plan_image(plan_id, rendered_entry)
+                
+                # Plans saved with the image's URL while it was still rendering
+                showing = db.session.scalars(select(HousePlan.id)
+                                             .where(HousePlan.gallery_media.contains(entry['sha256']))).all()
+                for showing_id in showing:
+                    if showing_id != plan_id:
+                        update_plan_media(showing_id, lambda plan: refresh_plan_image(plan, rendered_entry),
+                                          ('gallery_media', 'featured_image_url'))
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('Could not record image derivatives for %s', entry['sha256'])
+    return record
+
+@house_plans_bp.route('/upload-image', methods=['POST'])
+def upload_image():
+    """Store an uploaded image by content hash and render its derivatives in the background (Admin only)"""
+    try:
+        upload = request.files.get('image')
+        if not upload or not upload.filename:
+            return jsonify({'success': False, 'error': 'No image uploaded'}), 400
+        
+        filename = secure_filename(upload.filename)
+        extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        if not allowed_file(filename) or extension not in IMAGE_EXTENSIONS:
+            return jsonify({'success': False, 'error': 'Unsupported image type'}), 400
+        
+        plan_id = request.form.get('plan_id', type=int)
+        featured = request.form.get('role', 'gallery') == 'featured'
+        if plan_id is not None and not db.session.query(HousePlan.query.filter_by(id=plan_id).exists()).scalar():
+            return jsonify({'success': False, 'error': 'House plan not found'}), 404
+        
+        media_root = current_app.config['MEDIA_ROOT']
+        digest, relative_path = store_original(upload.stream, 'jpg' if extension == 'jpeg' else extension,
+                                               media_root)
+        entry = image_entry(digest, media_url(relative_path), featured=featured)
+        
+        # Kept by hash, so a plan saved later with this URL gets the entry and its derivatives
+        MediaImage.save(entry)
+        db.session.commit()
+        
+        # The original is usable right away; derivatives replace the entry when they are ready
+        if plan_id is not None:
+            record_plan_image(plan_id, entry)
+        
+        processing = image_pipeline.enabled
+        if processing:
+            app = current_app._get_current_object()
+            image_pipeline.submit(digest, relative_path, derivatives_ready(app, plan_id, entry))
+        
+        return jsonify({
+            'success': True,
+            'url': entry['url'],
+            'data': dict(entry, processing=processing)
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@house_plans_bp.route('/media/<path:filename>', methods=['GET'])
+def get_media(filename):
+    """Serve an uploaded original or derivative (content-addressed, so cacheable forever)"""
+    response = send_from_directory(current_app.config['MEDIA_ROOT'], filename, max_age=MEDIA_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={MEDIA_MAX_AGE}, immutable'
+    return response
+
+def get_plan_upload(plan_id, upload_id):
+    return FileUpload.query.filter_by(id=upload_id, plan_id=plan_id).first()
+
+@house_plans_bp.route('/house-plans/<int:plan_id>/files/uploads', methods=['POST'])
+def start_plan_file_upload(plan_id):
+    """Start a resumable upload of a PDF/DWG plan file (Admin only)"""
+    try:
+        if not db.session.query(HousePlan.query.filter_by(id=plan_id).exists()).scalar():
+            return jsonify({'success': False, 'error': 'House plan not found'}), 404
+        
+        data = request.get_json() or {}
+        filename = secure_filename(data.get('filename', ''))
+        size = data.get('size')
+        expected_sha256 = (data.get('sha256') or '').lower() or None
+        
+        extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        if not allowed_file(filename) or extension not in PLAN_FILE_EXTENSIONS:
+            return jsonify({'success': False, 'error': 'Plan files must be PDF or DWG'}), 400
+        
+        if not isinstance(size, int) or isinstance(size, bool) or size <= 0 or size > MAX_PLAN_FILE_SIZE:
+            return jsonify({'success': False, 'error': f'size must be between 1 and {MAX_PLAN_FILE_SIZE} bytes'}), 400
+        
+        if expected_sha256 is not None and (len(expected_sha256) != 64 or
+                                            any(c not in '0123456789abcdef' for c in expected_sha256)):
+            return jsonify({'success': False, 'error': 'sha256 must be a hex digest'}), 400
+        
+        # Abandoned uploads are swept whenever a new one starts
+        root = current_app.config['PLAN_FILES_ROOT']
+        expire_uploads(root, current_app.config['UPLOAD_EXPIRY'])
+        upload = start_upload(root, plan_id, filename, size, expected_sha256)
+        db.session.commit()
+        
+        data = upload.to_dict(offset=0)
+        data['chunk_size'] = UPLOAD_CHUNK_SIZE
+        return jsonify({'success': True, 'data': data}), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@house_plans_bp.route('/house-plans/<int:plan_id>/files/uploads/<upload_id>', methods=['GET'])
+def get_plan_file_upload(plan_id, upload_id):
+    """Get the offset to resume an upload from"""
+    try:
+        upload = get_plan_upload(plan_id, upload_id)
+        if not upload:
+            return jsonify({'success': False, 'error': 'Upload not found'}), 404
+        
+        offset = upload_offset(current_app.config['PLAN_FILES_ROOT'], upload)
+        response = jsonify({'success': True, 'data': upload.to_dict(offset=offset)})
+        response.headers['Upload-Offset'] = str(offset)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@house_plans_bp.route('/house-plans/<int:plan_id>/files/uploads/<upload_id>', methods=['PUT'])
+def put_plan_file_chunk(plan_id, upload_id):
+    """Append a raw chunk at ?offset= (or the Upload-Offset header), streamed straight to disk"""
+    try:
+        upload = get_plan_upload(plan_id, upload_id)
+        if not upload:
+            return jsonify({'success': False, 'error': 'Upload not found'}), 404
+        if upload.status == 'complete':
+            return jsonify({'success': False, 'error': 'Upload already completed'}), 409
+        
+        offset = request.args.get('offset', type=int)
+        if offset is None:
+            offset = request.headers.get('Upload-Offset', type=int)
+        if offset is None:
+            return jsonify({'success': False, 'error': 'offset is required'}), 400
+        
+        # Release the read transaction while the body streams in
+        root = current_app.config['PLAN_FILES_ROOT']
+        db.session.commit()
+        
+        try:
+            offset = write_chunk(root, upload, offset, request.stream)
+        except UploadConflict as e:
+            response = jsonify({'success': False, 'error': str(e), 'offset': e.offset})
+            response.headers['Upload-Offset'] = str(e.offset)
+            return response, 409
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        response = jsonify({'success': True, 'data': {'id': upload.id, 'offset': offset, 'size': upload.size}})
+        response.headers['Upload-Offset'] = str(offset)
+        return response
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@house_plans_bp.route('/house-plans/<int:plan_id>/files/uploads/<upload_id>/complete', methods=['POST'])
+def finish_plan_file_upload(plan_id, upload_id):
+    """Verify a fully uploaded file, store it by hash and add it to the plan's files"""
+    try:
+        upload = get_plan_upload(plan_id, upload_id)
+        if not upload:
+            return jsonify({'success': False, 'error': 'Upload not found'}), 404
+        
+        root = current_app.config['PLAN_FILES_ROOT']
+        try:
+            finish_upload(root, upload)
+        except UploadConflict as e:
+            return jsonify({'success': False, 'error': str(e), 'offset': e.offset}), 409
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        # Commit the finished upload first so a retried media write cannot lose it
+        data = upload.to_dict()
+        entry = plan_file_entry(upload)
+        db.session.commit()
+        update_plan_media(plan_id, lambda plan: attach_plan_file(plan, entry), ('stored_plan_files',))
+        
+        return jsonify({
+            'success': True,
+            'data': data,
+            'message': 'Plan file uploaded successfully'
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@house_plans_bp.route('/house-plans/<int:plan_id>/files/uploads/<upload_id>', methods=['DELETE'])
+def cancel_plan_file_upload(plan_id, upload_id):
+    """Abandon an unfinished upload and free its partial data"""
+    try:
+        upload = get_plan_upload(plan_id, upload_id)
+        if not upload:
+            return jsonify({'success': False, 'error': 'Upload not found'}), 404
+        if upload.status == 'complete':
+            return jsonify({'success': False, 'error': 'Upload already completed'}), 409
+        
+        discard_upload(current_app.config['PLAN_FILES_ROOT'], upload)
+        db.session.delete(upload)
+        db.session.commit()
+        
+        return jsonify({'success': True, 'message': 'Upload cancelled'})
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @house_plans_bp.route('/categories', methods=['GET'])
+@conditional_get
+@cached_response
 def get_categories():
     """Get all categories"""
     try:
-        categories = Category.query.filter_by(is_active=True).order_by(Category.name).all()
+        categories = Category.active_with_plan_counts()
         
         return jsonify({
             'success': True,
@@ -241,8 +1057,11 @@ def create_category():
         )
         
         db.session.add(category)
+        bump_catalog_version()
         db.session.commit()
         
+        response_cache.invalidate('house_plans.get_categories')
+        
         return jsonify({
             'success': True,
             'data': category.to_dict(),
@@ -254,24 +1073,34 @@ def create_category():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @house_plans_bp.route('/featured-plans', methods=['GET'])
+@conditional_get
+@cached_response
 def get_featured_plans():
     """Get featured house plans"""
     try:
         limit = request.args.get('limit', 6, type=int)
         
-        plans = HousePlan.query.filter_by(is_featured=True, is_active=True)\
-                              .order_by(HousePlan.created_at.desc())\
-                              .limit(limit).all()
+        try:
+            fields = HousePlan.resolve_fields(request.args.get('view'), request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        query = HousePlan.query.filter_by(is_featured=True, is_active=True)\
+                               .options(*HousePlan.projection_options(fields or PLAN_KEY_FIELDS))
+        
+        plans = query.order_by(HousePlan.created_at.desc()).limit(limit).all()
         
         return jsonify({
             'success': True,
-            'data': [plan.to_dict() for plan in plans]
+            'data': serialize_plan_page(plans, fields)
         })
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @house_plans_bp.route('/styles', methods=['GET'])
+@conditional_get
+@cached_response
 def get_styles():
     """Get all unique style categories"""
     try:
@@ -289,3 +1118,26 @@ def get_styles():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@house_plans_bp.route('/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Get response cache counters (Admin only)"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': response_cache.stats()
+        })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@house_plans_bp.route('/compression-stats', methods=['GET'])
+def get_compression_stats():
+    """Get API response compression ratio and CPU counters (Admin only)"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': response_compressor.stats()
+        })
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,42 @@
+from flask import request, make_response, g
+from src.models.catalog import get_catalog_version
+from datetime import timezone
+from functools import wraps
+import hashlib
+
+def catalog_etag(version):
+    """Build a validator for the current request path and query args at a catalog version"""
+    args = '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+    raw = f'{version}:{request.path}?{args}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def not_modified(etag, last_modified):
+    """Check the request's conditional headers against the current validators"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    return False
+
+def conditional_get(view):
+    """Serve catalog reads with ETag/Last-Modified validators and answer 304 when unchanged"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version, last_modified = get_catalog_version()
+        g.catalog_version = version  # cached_response tags its entries with it
+        etag = catalog_etag(version)
+
+        if not_modified(etag, last_modified):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag, weak=True)
+        if last_modified:
+            response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response
+    return wrapper
@@ -0,0 +1,62 @@
+from flask.json.provider import DefaultJSONProvider
+import math
+import re
+
+try:
+    import orjson
+except ImportError:  # optional dependency, the stdlib encoder is used without it
+    orjson = None
+
+# Number spellings where orjson and the stdlib differ (1e16 vs 1e+16, 0.00001 vs 1e-05).
+# Matches inside strings too, which only costs a fallback.
+_FLOAT_MISMATCH = re.compile(rb'[0-9]e[0-9+-]|[:,\[]-?0\.0000')
+
+def _has_non_finite(obj):
+    """Whether a NaN or infinite float sits anywhere in nested dicts, lists and tuples"""
+    stack = [(obj,)]
+    while stack:
+        container = stack.pop()
+        for value in (container.values() if isinstance(container, dict) else container):
+            if isinstance(value, float):
+                if not math.isfinite(value):
+                    return True
+            elif isinstance(value, (dict, list, tuple)):
+                stack.append(value)
+    return False
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes compact responses with orjson when it is installed
+
+    Output stays byte-identical to the default provider: keys are sorted, and
+    any body orjson would spell differently (non-ASCII text, DEL, exponent
+    floats, NaN and infinities, unsupported types) is re-encoded with the
+    stdlib. orjson writes NaN and infinities as null, so only a body that
+    contains null has its object walked for them. Dates and dataclasses go
+    through the same default() hook as before. Pretty-printed (debug)
+    responses always use the stdlib.
+    """
+
+    if orjson is not None:
+        OPTIONS = (orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE |
+                   orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+
+    def fast_dumps(self, obj):
+        """Compact JSON bytes with a trailing newline, or None when the stdlib must be used"""
+        if orjson is None or not self.sort_keys or not self.ensure_ascii:
+            return None
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self.OPTIONS)
+        except (TypeError, orjson.JSONEncodeError):
+            return None
+        if not body.isascii() or b'\x7f' in body or _FLOAT_MISMATCH.search(body):
+            return None
+        if b'null' in body and _has_non_finite(obj):
+            return None
+        return body
+
+    def response(self, *args, **kwargs):
+        if not ((self.compact is None and self._app.debug) or self.compact is False):
+            body = self.fast_dumps(self._prepare_response_obj(args, kwargs))
+            if body is not None:
+                return self._app.response_class(body, mimetype=self.mimetype)
+        return super().response(*args, **kwargs)
@@ -0,0 +1,20 @@
+import json
+
+# Decoded values are not memoized on the instance: an instance lives for one
+# request, and each caller gets a value it can change without touching the row.
+# List pages parse each column once per row through the row-tuple serializers
+# (serializers.py) instead.
+
+def decode_json_text(instance, column, default):
+    """Decode a JSON text column into a fresh value (default() when empty or malformed)"""
+    raw = getattr(instance, column)
+    if not raw:
+        return default()
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return default()
+
+def encode_json_text(instance, column, value):
+    """Store a value as JSON text"""
+    setattr(instance, column, json.dumps(value))
@@ -3,20 +3,35 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
+from flask import Flask, request
+import click
 from flask_cors import CORS
 
 # Import all models to ensure they are registered
 from src.models.user import db, User
 from src.models.house_plan import HousePlan, Category
-from src.models.order import Order, OrderItem, CartItem
+from src.models.order import Order, OrderItem, CartItem, CartVersion
 from src.models.payment import Payment, PaymentMethod
+from src.models.upload import FileUpload, MediaImage
+from src.models.catalog import CatalogVersion, init_catalog_version
+from src.models.migrations import SchemaMigration, run_migrations
+from src.models.catalog_engine import catalog_engine
+from src.models.search import init_search_index
 
 # Import all routes
 from src.routes.user import user_bp
 from src.routes.house_plans import house_plans_bp
 from src.routes.cart import cart_bp
 from src.routes.payments import payments_bp
+from src.routes.response_cache import response_cache, checkout_summary_cache
+from src.routes.compression import response_compressor
+from src.routes.query_plans import check_query_plans
+from src.routes.catalog_benchmark import run_catalog_benchmark
+from src.routes.serializer_benchmark import run_serializer_benchmark
+from src.routes.json_provider import FastJSONProvider
+from src.routes.plan_import import import_plans, IMPORT_FORMATS
+from src.routes.plan_images import image_pipeline
+from src.routes.static_assets import StaticManifest, asset_response
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -24,6 +39,9 @@ app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 # Enable CORS for all routes
 CORS(app, origins="*")
 
+# Sorted, compact JSON encoded with orjson when installed (same bytes as the default provider)
+app.json = FastJSONProvider(app)
+
 # Register blueprints
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(house_plans_bp, url_prefix='/api')
@@ -35,12 +53,62 @@ app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirnam
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
+# In-process response cache for read-heavy catalog routes
+app.config['RESPONSE_CACHE_SIZE'] = 256
+app.config['RESPONSE_CACHE_TTL'] = 300
+response_cache.init_app(app)
+
+# Checkout summaries per (user, cart version, catalog version); old versions just age out
+app.config['CHECKOUT_SUMMARY_CACHE_SIZE'] = 1024
+app.config['CHECKOUT_SUMMARY_CACHE_TTL'] = 600
+checkout_summary_cache.init_app(app, 'CHECKOUT_SUMMARY_CACHE')
+
+# gzip/brotli for /api responses (brotli needs the brotli package installed)
+app.config['COMPRESS_MIN_SIZE'] = 1024
+app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+app.config['COMPRESS_BROTLI_QUALITY'] = 4
+response_compressor.init_app(app)
+
+# Optional NumPy-backed engine for simple /house-plans filters and similar plans (needs numpy installed)
+app.config['CATALOG_ENGINE'] = os.environ.get('CATALOG_ENGINE', 'false').lower() == 'true'
+catalog_engine.init_app(app)
+
+# Content-addressed uploads; image derivatives are rendered in a process pool (needs Pillow installed)
+app.config['MEDIA_ROOT'] = os.path.join(os.path.dirname(__file__), 'media')
+app.config['IMAGE_WORKERS'] = int(os.environ.get('IMAGE_WORKERS', 2))
+image_pipeline.init_app(app)
+
+# Purchased plan files (PDF/DWG) are kept outside the public media folder
+app.config['PLAN_FILES_ROOT'] = os.path.join(os.path.dirname(__file__), 'plan_files')
+
+# Unfinished uploads with no chunk for this long are deleted with their partial files
+app.config['UPLOAD_EXPIRY'] = 24 * 3600
+
+# Signed download links for purchased plan files; behind nginx/Apache let the proxy send the bytes
+app.config['DOWNLOAD_TOKEN_MAX_AGE'] = 3600
+app.config['PLAN_FILES_DELIVERY'] = os.environ.get('PLAN_FILES_DELIVERY', 'sendfile')  # sendfile, x-accel-redirect, x-sendfile
+app.config['PLAN_FILES_ACCEL_PREFIX'] = '/protected-plan-files'
+
+# Requests without a user_id keep their cart in a signed cookie until login or checkout
+app.config['GUEST_CART'] = os.environ.get('GUEST_CART', 'true').lower() == 'true'
+app.config['GUEST_CART_MAX_AGE'] = 30 * 24 * 3600
+app.config['GUEST_CART_MAX_ITEMS'] = 50
+
 def init_database():
     """Initialize database with sample data"""
     with app.app_context():
         # Create all tables
         db.create_all()
         
+        # Apply schema migrations (indexes for existing databases)
+        run_migrations()
+        
+        # Create the full-text search index and its sync triggers
+        init_search_index()
+        
+        # Create the catalog version row used for HTTP cache validators
+        init_catalog_version()
+        
         # Check if we need to add sample data
         if User.query.count() == 0:
             # Create admin user
@@ -154,22 +222,93 @@ def init_database():
 # Initialize database
 init_database()
 
+# Hash, precompress and cache the frontend build once, at startup
+static_manifest = StaticManifest(app.static_folder).build()
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Flag hot route queries that regressed to full table scans"""
+    with app.app_context():
+        regressions = check_query_plans()
+    
+    if not regressions:
+        print("All route queries use indexes")
+        return
+    
+    for name, scans in regressions.items():
+        for scan in scans:
+            print(f"{name}: {scan}")
+    sys.exit(1)
+
+@app.cli.command('bench-catalog-engine')
+@click.option('--plans', default=50000, help='Number of synthetic plans')
+@click.option('--repeat', default=10, help='Timed runs per filter (best is reported)')
+def bench_catalog_engine_command(plans, repeat):
+    """Compare the SQL and in-memory engine paths of /house-plans"""
+    report = run_catalog_benchmark(plan_count=plans, repeat=repeat)
+    
+    print(f"{report['plans']} plans, engine snapshot built in {report['build_ms']} ms")
+    print(f"{'filter':<24}{'sql ms':>10}{'engine ms':>12}{'speedup':>10}  same results")
+    for result in report['results']:
+        print(f"{result['filter']:<24}{result['sql_ms']:>10}{result['engine_ms']:>12}"
+              f"{result['speedup']:>10}  {result['same_results']}")
+
+@app.cli.command('bench-serializers')
+@click.option('--plans', default=2000, help='Number of synthetic plans')
+@click.option('--repeat', default=20, help='Timed runs per case (best is reported)')
+def bench_serializers_command(plans, repeat):
+    """Compare to_dict() responses against the row-tuple serializers and FastJSONProvider"""
+    report = run_serializer_benchmark(plan_count=plans, repeat=repeat)
+    
+    print(f"{report['plans']} plans, {report['page_size']} per page")
+    print(f"{'case':<20}{'orm ms':>10}{'fast ms':>10}{'speedup':>10}{'bytes':>10}  identical")
+    for result in report['results']:
+        print(f"{result['case']:<20}{result['orm_ms']:>10}{result['fast_ms']:>10}"
+              f"{result['speedup']:>10}{result['bytes']:>10}  {result['identical']}")
+
+@app.cli.command('import-plans')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'import_format', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='File format (defaults to the file extension)')
+@click.option('--dry-run', is_flag=True, help='Validate rows without inserting them')
+@click.option('--batch-size', default=500, help='Rows inserted per transaction')
+@click.option('--created-by', required=True, type=int, help='Id of the user recorded as the plans\' creator')
+def import_plans_command(path, import_format, dry_run, batch_size, created_by):
+    """Bulk import house plans from a CSV or NDJSON file"""
+    if import_format is None:
+        import_format = 'csv' if path.lower().endswith('.csv') else 'ndjson'
+    
+    with app.app_context(), open(path, encoding='utf-8', newline='') as source:
+        try:
+            report = import_plans(source, import_format, created_by, dry_run=dry_run, batch_size=batch_size)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    
+    for error in report['errors']:
+        print(f"row {error['row']}: {error['error']}")
+    action = 'Validated' if dry_run else 'Imported'
+    print(f"{action} {report['imported']} of {report['processed']} rows, {report['failed']} failed")
+    if report['failed']:
+        sys.exit(1)
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
+    if app.static_folder is None:
             return "Static folder not configured", 404
 
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
+    asset = static_manifest.get(path) if path != "" else None
+    if asset is None and path != "" and app.debug:
+        # Pick up frontend rebuilds during development (only changed files are re-read)
+        asset = static_manifest.build().get(path)
+
+    # Unknown paths are SPA routes, answered from the cached index.html
+    if asset is None:
+        asset = static_manifest.index
+        if asset is None:
             return "index.html not found", 404
 
+    return asset_response(asset, request)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
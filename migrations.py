@@ -0,0 +1,99 @@
+from src.models.user import db
+from sqlalchemy import inspect, select, text, update
+from datetime import datetime
+import json
+
+class SchemaMigration(db.Model):
+    """Applied schema migrations"""
+    version = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<SchemaMigration {self.version} {self.name}>'
+
+# Indexes declared on the models for the hot route filters and sorts
+HOT_FILTER_INDEXES = [
+    ('house_plan', 'ix_house_plan_listing'),
+    ('house_plan', 'ix_house_plan_featured'),
+    ('house_plan', 'ix_house_plan_price'),
+    ('house_plan', 'ix_house_plan_bedrooms'),
+    ('house_plan', 'ix_house_plan_style'),
+    ('plan_categories', 'ix_plan_categories_category'),
+    ('order', 'ix_order_user_created'),
+    ('order_item', 'ix_order_item_order_id'),
+    ('payment', 'ix_payment_order_id'),
+    ('payment', 'ix_payment_gateway_reference'),
+]
+
+def create_model_indexes(indexes):
+    """Create the named model indexes that do not exist yet"""
+    for table_name, index_name in indexes:
+        table = db.metadata.tables[table_name]
+        index = next(index for index in table.indexes if index.name == index_name)
+        index.create(bind=db.engine, checkfirst=True)
+
+def add_model_columns(table_name, column_names):
+    """Add nullable model columns that an existing table does not have yet
+
+    create_all() only creates missing tables, so new columns on old databases
+    need an ALTER TABLE.
+    """
+    existing = {column['name'] for column in inspect(db.engine).get_columns(table_name)}
+    table = db.metadata.tables[table_name]
+    with db.engine.begin() as connection:
+        for column_name in column_names:
+            if column_name in existing:
+                continue
+            column_type = table.c[column_name].type.compile(dialect=db.engine.dialect)
+            connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}'))
+
+def move_json_entries(table_name, source, target, leave=None):
+    """Move object entries of a JSON list column into another JSON list column
+
+    Plain string entries stay where they are. With leave, the moved entry's
+    value under that key is left behind in the source list as a string.
+    """
+    table = db.metadata.tables[table_name]
+    rows = db.session.execute(select(table.c.id, table.c[source], table.c[target])
+                              .where(table.c[source].like('%{%'))).all()
+    for row_id, source_text, target_text in rows:
+        kept, moved = [], json.loads(target_text) if target_text else []
+        for entry in json.loads(source_text):
+            if isinstance(entry, dict):
+                moved.append(entry)
+                if leave and entry.get(leave) and entry[leave] not in kept:
+                    kept.append(entry[leave])
+            elif entry not in kept:
+                kept.append(entry)
+        db.session.execute(update(table).where(table.c.id == row_id).values({
+            source: json.dumps(kept) if kept else None,
+            target: json.dumps(moved) if moved else None
+        }))
+
+def split_gallery_media():
+    add_model_columns('house_plan', ['gallery_media'])
+    move_json_entries('house_plan', 'gallery_images', 'gallery_media', leave='url')
+
+def split_stored_plan_files():
+    add_model_columns('house_plan', ['stored_plan_files'])
+    move_json_entries('house_plan', 'plan_files', 'stored_plan_files')
+
+# Ordered list of (version, name, upgrade function)
+MIGRATIONS = [
+    (1, 'Add hot filter indexes', lambda: create_model_indexes(HOT_FILTER_INDEXES)),
+    (2, 'Move uploaded plan files out of plan_files', split_stored_plan_files),
+    (3, 'Move uploaded image entries out of gallery_images', split_gallery_media),
+]
+
+def run_migrations():
+    """Apply pending migrations in order"""
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+
+    for version, name, upgrade in MIGRATIONS:
+        if version in applied:
+            continue
+        upgrade()
+        db.session.add(SchemaMigration(version=version, name=name))
+        db.session.commit()
+        print(f"Applied migration {version}: {name}")
@@ -1,8 +1,17 @@
 from src.models.user import db
+from src.models.json_text import decode_json_text, encode_json_text
+from src.models.house_plan import HousePlan
+from src.models.catalog import CatalogVersion
+from sqlalchemy import select, literal, case
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
-import json
 import uuid
 
+def dialect_insert(model):
+    """INSERT for the bound database, with ON CONFLICT support on SQLite and PostgreSQL"""
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    return dialect.insert(model)
+
 class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(50), unique=True, nullable=False)
@@ -15,9 +24,13 @@ class Order(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Order history is listed per user, newest first
+    __table_args__ = (db.Index('ix_order_user_created', 'user_id', 'created_at', 'id'),)
+    
     # Relationships
     user = db.relationship('User', backref=db.backref('orders', lazy=True))
-    items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
+    items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan',
+                            order_by='OrderItem.id')
     
     def __init__(self, **kwargs):
         super(Order, self).__init__(**kwargs)
@@ -31,16 +44,11 @@ class Order(db.Model):
     
     def get_billing_address(self):
         """Parse billing address JSON string"""
-        if self.billing_address:
-            try:
-                return json.loads(self.billing_address)
-            except json.JSONDecodeError:
-                return {}
-        return {}
+        return decode_json_text(self, 'billing_address', dict)
     
     def set_billing_address(self, address_dict):
         """Set billing address as JSON string"""
-        self.billing_address = json.dumps(address_dict)
+        encode_json_text(self, 'billing_address', address_dict)
     
     def calculate_total(self):
         """Calculate total amount from order items"""
@@ -67,7 +75,7 @@ class Order(db.Model):
 
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
     plan_id = db.Column(db.Integer, db.ForeignKey('house_plan.id'), nullable=False)
     quantity = db.Column(db.Integer, default=1)
     unit_price = db.Column(db.Float, nullable=False)
@@ -112,14 +120,67 @@ class CartItem(db.Model):
     def __repr__(self):
         return f'<CartItem {self.plan.title if self.plan else "Unknown"} x{self.quantity}>'
     
-    def to_dict(self):
+    @classmethod
+    def add_quantities(cls, user_id, quantities):
+        """Add {plan_id: quantity} to a user's cart in one INSERT ... ON CONFLICT DO UPDATE
+        
+        Rows are selected from the active plans, so the plan existence check and the
+        write are one round trip, and concurrent adds of the same plan sum up instead
+        of racing into unique_user_plan_cart. Returns {plan_id: (id, quantity, created_at)}
+        for the plans that exist.
+        """
+        source = select(
+            literal(user_id),
+            HousePlan.id,
+            case(quantities, value=HousePlan.id),
+            literal(datetime.utcnow(), cls.created_at.type)
+        ).where(HousePlan.id.in_(quantities), HousePlan.is_active == True)
+        
+        statement = dialect_insert(cls).from_select(['user_id', 'plan_id', 'quantity', 'created_at'], source)
+        statement = statement.on_conflict_do_update(
+            index_elements=[cls.user_id, cls.plan_id],
+            set_={'quantity': cls.quantity + statement.excluded.quantity}
+        ).returning(cls.id, cls.plan_id, cls.quantity, cls.created_at)
+        
+        return {plan_id: (item_id, quantity, created_at)
+                for item_id, plan_id, quantity, created_at in db.session.execute(statement)}
+    
+    def to_dict(self, plan_fields=None):
+        if plan_fields is None:
+            plan = self.plan.to_dict() if self.plan else None
+        else:
+            plan = self.plan.to_summary_dict(plan_fields) if self.plan else None
+        
         return {
             'id': self.id,
             'user_id': self.user_id,
             'plan_id': self.plan_id,
             'quantity': self.quantity,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'plan': self.plan.to_dict() if self.plan else None,
+            'plan': plan,
             'total_price': self.plan.price * self.quantity if self.plan else 0
         }
 
+class CartVersion(db.Model):
+    """Per-user write counter for the cart, bumped by every cart mutation"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    
+    def __repr__(self):
+        return f'<CartVersion {self.user_id} v{self.version}>'
+
+def get_cart_versions(user_id):
+    """Get a user's (cart version, catalog version) in one query; 0 for a cart that was never written"""
+    row = db.session.execute(select(
+        select(CartVersion.version).where(CartVersion.user_id == user_id).scalar_subquery(),
+        select(CatalogVersion.version).where(CatalogVersion.id == 1).scalar_subquery()
+    )).first()
+    return row[0] or 0, row[1] or 0
+
+def bump_cart_version(user_id):
+    """Bump a user's cart version as part of the current transaction"""
+    statement = dialect_insert(CartVersion).values(user_id=user_id, version=1)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[CartVersion.user_id],
+        set_={'version': CartVersion.version + 1}
+    ))
@@ -0,0 +1,83 @@
+from sqlalchemy import and_, or_, literal, DateTime
+from datetime import datetime
+import base64
+import json
+
+# per_page Flask-SQLAlchemy's paginate() falls back to, mirrored for offset pages served without it
+PAGINATE_DEFAULT_PER_PAGE = 20
+
+def encode_cursor(values):
+    """Encode sort key values as an opaque URL-safe cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, keys):
+    """Decode a cursor into sort key values, raising ValueError if it is invalid"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError('Invalid cursor')
+
+    decoded = []
+    for (column, _), value in zip(keys, values):
+        if value is not None and isinstance(column.type, DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (ValueError, TypeError):
+                raise ValueError('Invalid cursor')
+        decoded.append(value)
+    return decoded
+
+def keyset_filter(keys, values):
+    """Build the WHERE clause selecting rows strictly after the given key values"""
+    bound = [literal(value, type_=column.type) for (column, _), value in zip(keys, values)]
+    clauses = []
+    for index, (column, descending) in enumerate(keys):
+        prefix = [keys[i][0] == bound[i] for i in range(index)]
+        step = column < bound[index] if descending else column > bound[index]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+def keyset_paginate(query, keys, cursor, per_page):
+    """Fetch one page of a query using keyset (seek) pagination
+
+    keys is a list of (column, descending) pairs that uniquely order the rows.
+    Returns the page items and the cursor for the next page (None on the last page).
+    """
+    columns = [column for column, _ in keys]
+    query = query.order_by(None).order_by(
+        *[column.desc() if descending else column.asc() for column, descending in keys]
+    )
+
+    if cursor:
+        query = query.filter(keyset_filter(keys, decode_cursor(cursor, keys)))
+
+    rows = query.add_columns(*columns).limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    items = [row[0] for row in rows]
+    next_cursor = encode_cursor(list(rows[-1][1:])) if has_next and rows else None
+    return items, next_cursor
+
+def page_bounds(page, per_page):
+    """The page and per_page query.paginate(error_out=False) actually serves for the requested ones"""
+    return max(page, 1), per_page if per_page >= 1 else PAGINATE_DEFAULT_PER_PAGE
+
+def page_info(page, per_page, total):
+    """Pagination block for an offset page, as the paginate() route reports it (requested page and per_page)"""
+    served_page, served_per_page = page_bounds(page, per_page)
+    pages = -(-total // served_per_page) if total else 0
+    return {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': pages,
+        'has_next': served_page < pages,
+        'has_prev': served_page > 1
+    }
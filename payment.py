@@ -1,16 +1,16 @@
 from src.models.user import db
+from src.models.json_text import decode_json_text, encode_json_text
 from datetime import datetime
-import json
 
 class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
     payment_method = db.Column(db.String(50), nullable=False)  # credit_card, eft_bank
     payment_gateway = db.Column(db.String(50), nullable=False)  # payfast, ozow, stitch
     amount = db.Column(db.Float, nullable=False)
     currency = db.Column(db.String(3), default='ZAR')
     status = db.Column(db.String(50), default='pending')  # pending, processing, completed, failed, cancelled
-    gateway_reference = db.Column(db.String(200))  # Reference from payment gateway
+    gateway_reference = db.Column(db.String(200), index=True)  # Reference from payment gateway
     gateway_response = db.Column(db.Text)  # JSON response from gateway
     transaction_id = db.Column(db.String(200))  # Transaction ID from gateway
     
@@ -33,16 +33,11 @@ class Payment(db.Model):
     
     def get_gateway_response(self):
         """Parse gateway response JSON string"""
-        if self.gateway_response:
-            try:
-                return json.loads(self.gateway_response)
-            except json.JSONDecodeError:
-                return {}
-        return {}
+        return decode_json_text(self, 'gateway_response', dict)
     
     def set_gateway_response(self, response_dict):
         """Set gateway response as JSON string"""
-        self.gateway_response = json.dumps(response_dict)
+        encode_json_text(self, 'gateway_response', response_dict)
     
     def to_dict(self):
         return {
@@ -84,29 +79,19 @@ class PaymentMethod(db.Model):
     
     def get_supported_cards(self):
         """Parse supported cards JSON string"""
-        if self.supported_cards:
-            try:
-                return json.loads(self.supported_cards)
-            except json.JSONDecodeError:
-                return []
-        return []
+        return decode_json_text(self, 'supported_cards', list)
     
     def set_supported_cards(self, cards_list):
         """Set supported cards as JSON string"""
-        self.supported_cards = json.dumps(cards_list)
+        encode_json_text(self, 'supported_cards', cards_list)
     
     def get_supported_banks(self):
         """Parse supported banks JSON string"""
-        if self.supported_banks:
-            try:
-                return json.loads(self.supported_banks)
-            except json.JSONDecodeError:
-                return []
-        return []
+        return decode_json_text(self, 'supported_banks', list)
     
     def set_supported_banks(self, banks_list):
         """Set supported banks as JSON string"""
-        self.supported_banks = json.dumps(banks_list)
+        encode_json_text(self, 'supported_banks', banks_list)
     
     def to_dict(self):
         return {
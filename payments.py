@@ -3,6 +3,8 @@ from src.models.user import db
 from src.models.order import Order, OrderItem
 from src.models.payment import Payment, PaymentMethod, SA_BANKS, CARD_TYPES
 from src.models.house_plan import HousePlan
+from src.models.serializers import serialize_payment_methods, serialize_payment
+from src.routes.http_cache import conditional_get
 import hashlib
 import urllib.parse
 import requests
@@ -28,15 +30,15 @@ OZOW_CONFIG = {
 }
 
 @payments_bp.route('/payment-methods', methods=['GET'])
+@conditional_get
 def get_payment_methods():
     """Get available payment methods for South Africa"""
     try:
-        methods = PaymentMethod.query.filter_by(is_active=True)\
-                                   .order_by(PaymentMethod.display_order).all()
+        methods = serialize_payment_methods(PaymentMethod.is_active == True)
         
         return jsonify({
             'success': True,
-            'data': [method.to_dict() for method in methods]
+            'data': methods
         })
     
     except Exception as e:
@@ -333,13 +335,13 @@ def ozow_notify():
 def get_payment_status(payment_id):
     """Get payment status"""
     try:
-        payment = Payment.query.get(payment_id)
+        payment = serialize_payment(payment_id)
         if not payment:
             return jsonify({'success': False, 'error': 'Payment not found'}), 404
         
         return jsonify({
             'success': True,
-            'data': payment.to_dict()
+            'data': payment
         })
     
     except Exception as e:
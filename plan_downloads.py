@@ -0,0 +1,92 @@
+from flask import current_app, send_file, Response
+from src.models.user import db
+from src.models.order import OrderItem
+from src.models.house_plan import HousePlan
+from src.routes.plan_uploads import stored_path
+from itsdangerous import URLSafeTimedSerializer
+from urllib.parse import quote
+import mimetypes
+import os
+
+# Orders in these states have been paid for and unlock their plan files
+PAID_ORDER_STATUSES = ('paid', 'completed')
+
+DOWNLOAD_TOKEN_SALT = 'plan-file-download'
+
+# How the file bytes leave the server: Flask sendfile, nginx X-Accel-Redirect or Apache/lighttpd X-Sendfile
+DELIVERY_MODES = ('sendfile', 'x-accel-redirect', 'x-sendfile')
+
+def download_serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt=DOWNLOAD_TOKEN_SALT)
+
+def issue_download_token(order_id, plan_id, entry):
+    """Sign everything needed to serve a plan file, so downloads never touch the database"""
+    return download_serializer().dumps([order_id, plan_id, entry['sha256'], entry['name']])
+
+def read_download_token(token):
+    """Verify a download token, returning (order id, plan id, sha256, filename)
+
+    Raises itsdangerous.SignatureExpired or BadSignature for stale or forged tokens.
+    """
+    max_age = current_app.config['DOWNLOAD_TOKEN_MAX_AGE']
+    order_id, plan_id, digest, name = download_serializer().loads(token, max_age=max_age)
+    return order_id, plan_id, digest, name
+
+def order_plan_files(order):
+    """Plan files unlocked by a paid order, as {plan_id, title, files} with signed download tokens
+
+    Stored files get a token; plain URLs from before uploads existed are passed through.
+    """
+    fields = ['id', 'title', 'plan_files', 'stored_plan_files']
+    plans_query = HousePlan.query.options(*HousePlan.projection_options(fields))\
+                                 .filter(HousePlan.id.in_(db.session.query(OrderItem.plan_id)
+                                                                    .filter(OrderItem.order_id == order.id)))\
+                                 .order_by(HousePlan.id)
+
+    plans = []
+    for plan in plans_query:
+        files = [{
+            'name': entry['name'],
+            'size': entry.get('size'),
+            'sha256': entry['sha256'],
+            'token': issue_download_token(order.id, plan.id, entry)
+        } for entry in plan.get_stored_plan_files()]
+        files.extend({'url': url} for url in plan.get_plan_files())
+        plans.append({'plan_id': plan.id, 'title': plan.title, 'files': files})
+    return plans
+
+def plan_file_response(digest, name):
+    """Response that streams a stored plan file without reading it into Python memory
+
+    sendfile mode hands the open file to the WSGI server (zero-copy where it
+    supports wsgi.file_wrapper) and answers Range/If-Range requests itself. The
+    proxy modes return only a header and let nginx or Apache send the bytes,
+    ranges included.
+    """
+    root = current_app.config['PLAN_FILES_ROOT']
+    relative_path = stored_path(digest)
+    path = os.path.join(root, relative_path)
+    if not os.path.isfile(path):
+        return None
+
+    mode = current_app.config['PLAN_FILES_DELIVERY']
+    if mode not in DELIVERY_MODES:
+        raise ValueError(f'Unknown plan file delivery mode: {mode}')
+    mimetype = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    if mode == 'sendfile':
+        # Content-addressed, so the hash is a strong validator for If-Range
+        response = send_file(path, mimetype=mimetype, as_attachment=True, download_name=name,
+                             conditional=True, etag=digest, max_age=0)
+    else:
+        response = Response(mimetype=mimetype)
+        response.headers['Content-Disposition'] = f"attachment; filename*=UTF-8''{quote(name)}"
+        response.headers['ETag'] = f'"{digest}"'
+        if mode == 'x-accel-redirect':
+            prefix = current_app.config['PLAN_FILES_ACCEL_PREFIX'].rstrip('/')
+            response.headers['X-Accel-Redirect'] = f"{prefix}/{relative_path.replace(os.sep, '/')}"
+        else:
+            response.headers['X-Sendfile'] = os.path.abspath(path)
+
+    response.headers['Cache-Control'] = 'private, no-transform'
+    return response
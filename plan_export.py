@@ -0,0 +1,106 @@
+from src.models.user import db
+from src.models.house_plan import HousePlan, Category, plan_categories, PLAN_FIELDS
+from src.routes.plan_import import CSV_LIST_SEPARATOR
+from datetime import datetime
+import csv
+import io
+import json
+import zlib
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+EXPORT_FIELDS = PLAN_FIELDS + ('categories',)
+
+# Rows fetched per round trip, and bytes buffered before a chunk is sent
+EXPORT_YIELD_PER = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+JSON_TEXT_FIELDS = ('gallery_images', 'gallery_media', 'plan_files')
+
+def iter_export_plans():
+    """Yield active plans as dicts, ordered by id, without loading the catalog into memory"""
+    plan_rows = db.session.query(*[getattr(HousePlan, field) for field in PLAN_FIELDS])\
+                          .filter(HousePlan.is_active == True)\
+                          .order_by(HousePlan.id)\
+                          .execution_options(yield_per=EXPORT_YIELD_PER)
+
+    # Category links streamed in the same order and merged as we go
+    link_rows = iter(db.session.query(plan_categories.c.plan_id, Category.slug)
+                               .join(Category, Category.id == plan_categories.c.category_id)
+                               .join(HousePlan, HousePlan.id == plan_categories.c.plan_id)
+                               .filter(HousePlan.is_active == True)
+                               .order_by(plan_categories.c.plan_id, Category.slug)
+                               .execution_options(yield_per=EXPORT_YIELD_PER))
+    link = next(link_rows, None)
+
+    for row in plan_rows:
+        plan = dict(zip(PLAN_FIELDS, row))
+        for field in JSON_TEXT_FIELDS:
+            try:
+                plan[field] = json.loads(plan[field]) if plan[field] else []
+            except json.JSONDecodeError:
+                plan[field] = []
+        for field, value in plan.items():
+            if isinstance(value, datetime):
+                plan[field] = value.isoformat()
+
+        categories = []
+        while link is not None and link[0] < plan['id']:
+            link = next(link_rows, None)
+        while link is not None and link[0] == plan['id']:
+            categories.append(link[1])
+            link = next(link_rows, None)
+        plan['categories'] = categories
+
+        yield plan
+
+def iter_ndjson(plans):
+    for plan in plans:
+        yield json.dumps(plan, separators=(',', ':')) + '\n'
+
+def iter_csv(plans):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for plan in plans:
+        for field in JSON_TEXT_FIELDS + ('categories',):
+            # Uploaded image entries are kept as their URL; CSV cells hold plain lists
+            plan[field] = CSV_LIST_SEPARATOR.join(item.get('url') or item.get('name', '') if isinstance(item, dict)
+                                                  else item for item in plan[field])
+        writer.writerow(plan)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def iter_chunks(pieces, compress=False):
+    """Group text pieces into byte chunks, optionally gzip-compressing on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+    pending = []
+    size = 0
+
+    def emit(data):
+        return compressor.compress(data) if compressor else data
+
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        pending.append(data)
+        size += len(data)
+        if size >= EXPORT_CHUNK_SIZE:
+            chunk = emit(b''.join(pending))
+            pending, size = [], 0
+            if chunk:
+                yield chunk
+
+    tail = emit(b''.join(pending))
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
+
+def export_plans(export_format, compress=False):
+    """Stream the active catalog as NDJSON or CSV byte chunks"""
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f'Unsupported export format: {export_format}')
+    rows = iter_ndjson if export_format == 'ndjson' else iter_csv
+    return iter_chunks(rows(iter_export_plans()), compress=compress)
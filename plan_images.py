@@ -0,0 +1,216 @@
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import os
+import tempfile
+import threading
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional dependency, originals are stored without derivatives
+    Image = None
+
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+
+# Derivative sizes (bounding boxes, never upscaled) generated for every uploaded image
+IMAGE_DERIVATIVES = (
+    ('thumbnail', 320, 240),
+    ('card', 640, 480),
+    ('hero', 1600, 1200),
+)
+
+# Output formats: (extension, Pillow format, save options)
+DERIVATIVE_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+# Derivative used for featured_image_url (JPEG so every client can display it)
+FEATURED_DERIVATIVE = ('card', 'jpg')
+
+# URL prefix the media folder is served under
+MEDIA_URL_PREFIX = '/api/media'
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def media_url(relative_path):
+    return f"{MEDIA_URL_PREFIX}/{relative_path.replace(os.sep, '/')}"
+
+def original_path(digest, extension):
+    """Content-addressed location of an original, relative to the media root"""
+    return os.path.join('originals', digest[:2], f'{digest}.{extension}')
+
+def derivative_path(digest, name, extension):
+    return os.path.join('derivatives', digest[:2], digest, f'{name}.{extension}')
+
+def store_original(stream, extension, media_root):
+    """Stream an upload to disk while hashing it, returning (sha256, relative path)
+
+    Identical uploads resolve to the same file, so re-uploading an image is free.
+    """
+    incoming = os.path.join(media_root, 'incoming')
+    os.makedirs(incoming, exist_ok=True)
+
+    digest = hashlib.sha256()
+    handle, temp_path = tempfile.mkstemp(dir=incoming)
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                output.write(chunk)
+
+        relative_path = original_path(digest.hexdigest(), extension)
+        target = os.path.join(media_root, relative_path)
+        if os.path.exists(target):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return digest.hexdigest(), relative_path
+
+def render_derivatives(media_root, digest, relative_path):
+    """Generate every derivative of an original (runs in a worker process)
+
+    Derivatives that already exist are only measured, so retries are cheap.
+    """
+    with Image.open(os.path.join(media_root, relative_path)) as source:
+        image = ImageOps.exif_transpose(source)
+        image.load()
+    width, height = image.size
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    derivatives = []
+    for name, max_width, max_height in IMAGE_DERIVATIVES:
+        resized = image.copy()
+        resized.thumbnail((max_width, max_height), Image.LANCZOS)
+        flattened = None
+
+        for extension, image_format, options in DERIVATIVE_FORMATS:
+            output = derivative_path(digest, name, extension)
+            target = os.path.join(media_root, output)
+            if not os.path.exists(target):
+                frame = resized
+                if image_format == 'JPEG' and resized.mode != 'RGB':
+                    if flattened is None:
+                        flattened = Image.new('RGB', resized.size, (255, 255, 255))
+                        flattened.paste(resized, mask=resized.getchannel('A'))
+                    frame = flattened
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                temp_path = f'{target}.{os.getpid()}.tmp'
+                frame.save(temp_path, image_format, **options)
+                os.replace(temp_path, target)
+
+            derivatives.append({
+                'name': name,
+                'format': 'jpeg' if extension == 'jpg' else extension,
+                'url': media_url(output),
+                'width': resized.width,
+                'height': resized.height
+            })
+
+    return {'width': width, 'height': height, 'derivatives': derivatives}
+
+def image_entry(digest, url, rendered=None, featured=False):
+    """Gallery entry for an uploaded image, with dimensions once derivatives exist"""
+    entry = {'url': url, 'sha256': digest, 'width': None, 'height': None, 'derivatives': []}
+    if rendered:
+        entry.update(rendered)
+    if featured:
+        entry['featured'] = True
+    return entry
+
+def attach_plan_image(plan, entry):
+    """Add or replace an uploaded image in the plan's gallery, updating featured_image_url
+
+    gallery_images stays a list of URL strings; the entry itself (hash,
+    dimensions, derivatives) goes to gallery_media, matched by hash.
+    """
+    media = [image for image in plan.get_gallery_media() if image.get('sha256') != entry['sha256']]
+    images = [url for url in plan.get_gallery_images() if url != entry['url']]
+
+    if entry.get('featured'):
+        media = [dict(image, featured=False) if image.get('featured') else image for image in media]
+        media.insert(0, entry)
+        images.insert(0, entry['url'])
+        plan.featured_image_url = featured_url(entry)
+    else:
+        media.append(entry)
+        images.append(entry['url'])
+
+    plan.set_gallery_media(media)
+    plan.set_gallery_images(images)
+
+def refresh_plan_image(plan, entry):
+    """Swap a newly rendered entry in for the same image in the plan's gallery, keeping its place and role"""
+    media = []
+    for image in plan.get_gallery_media():
+        if image.get('sha256') == entry['sha256']:
+            featured = image.get('featured', False)
+            if featured and plan.featured_image_url in (image['url'], featured_url(image)):
+                plan.featured_image_url = featured_url(entry)
+            rendered = {key: entry[key] for key in ('width', 'height', 'derivatives')}
+            image = image_entry(entry['sha256'], image['url'], rendered, featured=featured)
+        media.append(image)
+    plan.set_gallery_media(media)
+
+def featured_url(entry):
+    """featured_image_url for an image entry: its featured derivative, or the original until that exists"""
+    name, extension = FEATURED_DERIVATIVE
+    featured_format = 'jpeg' if extension == 'jpg' else extension
+    return next((derivative['url'] for derivative in entry['derivatives']
+                 if derivative['name'] == name and derivative['format'] == featured_format),
+                entry['url'])
+
+class ImagePipeline:
+    """Process pool that renders image derivatives off the request path"""
+
+    def __init__(self):
+        self.media_root = None
+        self.workers = 2
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('MEDIA_ROOT', os.path.join(app.root_path, 'media'))
+        app.config.setdefault('IMAGE_WORKERS', 2)
+        self.media_root = app.config['MEDIA_ROOT']
+        self.workers = app.config['IMAGE_WORKERS']
+        if Image is None:
+            app.logger.warning('Pillow is not installed: uploaded images are stored without derivatives')
+
+    @property
+    def enabled(self):
+        return Image is not None
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    def submit(self, digest, relative_path, callback):
+        """Render derivatives in the pool and call callback(rendered, error) when done
+
+        The callback runs on the pool's result thread, not in the request.
+        """
+        def finished(future):
+            error = future.exception()
+            callback(None if error else future.result(), error)
+
+        future = self._pool().submit(render_derivatives, self.media_root, digest, relative_path)
+        future.add_done_callback(finished)
+        return future
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+image_pipeline = ImagePipeline()
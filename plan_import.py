@@ -0,0 +1,179 @@
+from src.models.user import db, User
+from src.models.house_plan import HousePlan, Category, plan_categories, REQUIRED_PLAN_FIELDS
+from src.models.catalog import bump_catalog_version
+from sqlalchemy import insert
+from datetime import datetime
+import csv
+import json
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+
+# Errors kept in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+# Separator for list values (categories, gallery_images, plan_files) in CSV cells
+CSV_LIST_SEPARATOR = '|'
+
+def iter_import_rows(text_stream, import_format):
+    """Yield (row number, row dict or None, parse error or None) from a CSV or NDJSON text stream"""
+    if import_format == 'csv':
+        for number, row in enumerate(csv.DictReader(text_stream), start=1):
+            yield number, row, None
+        return
+
+    number = 0
+    for line in text_stream:
+        line = line.strip()
+        if not line:
+            continue
+        number += 1
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield number, None, f'Invalid JSON: {e.msg}'
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'Row must be a JSON object'
+            continue
+        yield number, row, None
+
+def _as_list(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in str(value).split(CSV_LIST_SEPARATOR) if item.strip()]
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+def _as_int(value, field):
+    """An integer column value: ints and integer strings, or floats with no fractional part (3.0, not 2.7)"""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f'{field} must be a whole number, got {value!r}')
+    return int(value)
+
+def parse_plan_row(row, category_ids, created_by):
+    """Validate and coerce one import row into house_plan column values and category ids"""
+    for field in REQUIRED_PLAN_FIELDS:
+        if row.get(field) is None or row.get(field) == '':
+            raise ValueError(f'Missing required field: {field}')
+
+    try:
+        values = {
+            'title': str(row['title']).strip(),
+            'description': str(row['description']),
+            'price': float(row['price']),
+            'bedrooms': _as_int(row['bedrooms'], 'bedrooms'),
+            'bathrooms': float(row['bathrooms']),
+            'stories': _as_int(row['stories'], 'stories'),
+            'garage_spaces': _as_int(row.get('garage_spaces') or 0, 'garage_spaces'),
+            'square_footage': _as_int(row['square_footage'], 'square_footage'),
+            'style_category': str(row['style_category']).strip(),
+        }
+    except (TypeError, ValueError) as e:
+        raise ValueError(f'Invalid value: {e}')
+
+    gallery_images = _as_list(row.get('gallery_images'))
+    plan_files = _as_list(row.get('plan_files'))
+    now = datetime.utcnow()
+    values.update({
+        'featured_image_url': row.get('featured_image_url') or None,
+        'gallery_images': json.dumps(gallery_images) if gallery_images else None,
+        'plan_files': json.dumps(plan_files) if plan_files else None,
+        'is_featured': _as_bool(row.get('is_featured', False)),
+        'is_active': True,
+        'created_at': now,
+        'updated_at': now,
+        'created_by': created_by
+    })
+
+    slugs = _as_list(row.get('categories'))
+    unknown = [slug for slug in slugs if slug not in category_ids]
+    if unknown:
+        raise ValueError(f"Unknown categories: {', '.join(unknown)}")
+
+    return values, sorted({category_ids[slug] for slug in slugs})
+
+def _insert_batch(batch):
+    """Insert one batch of parsed plans and their category links in a single transaction"""
+    table = HousePlan.__table__
+    result = db.session.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True),
+        [values for _, values, _ in batch]
+    )
+    plan_ids = [row[0] for row in result]
+
+    links = [
+        {'plan_id': plan_id, 'category_id': category_id}
+        for plan_id, (_, _, categories) in zip(plan_ids, batch)
+        for category_id in categories
+    ]
+    if links:
+        db.session.execute(plan_categories.insert(), links)
+
+    bump_catalog_version()
+    db.session.commit()
+
+def import_plans(text_stream, import_format, created_by, dry_run=False, batch_size=500):
+    """Stream-import house plans, inserting valid rows in batches and reporting per-row errors
+
+    created_by is the id of the user recorded as the creator of every imported plan.
+    """
+    if import_format not in IMPORT_FORMATS:
+        raise ValueError(f'Unsupported import format: {import_format}')
+    if db.session.get(User, created_by) is None:
+        raise ValueError(f'Unknown user: {created_by}')
+
+    category_ids = dict(db.session.query(Category.slug, Category.id))
+    report = {'dry_run': dry_run, 'processed': 0, 'imported': 0, 'failed': 0, 'errors': []}
+
+    def record_error(number, error):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': number, 'error': error})
+
+    def flush(batch):
+        if dry_run:
+            report['imported'] += len(batch)
+            return
+        try:
+            _insert_batch(batch)
+            report['imported'] += len(batch)
+            return
+        except Exception:
+            db.session.rollback()
+
+        # Retry row by row so only the rows the database really rejects are reported
+        for row in batch:
+            try:
+                _insert_batch([row])
+                report['imported'] += 1
+            except Exception as e:
+                db.session.rollback()
+                record_error(row[0], f'Insert failed: {getattr(e, "orig", None) or e}')
+
+    batch = []
+    for number, row, error in iter_import_rows(text_stream, import_format):
+        report['processed'] += 1
+        if error is None:
+            try:
+                values, categories = parse_plan_row(row, category_ids, created_by)
+            except ValueError as e:
+                error = str(e)
+        if error is not None:
+            record_error(number, error)
+            continue
+
+        batch.append((number, values, categories))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+
+    if batch:
+        flush(batch)
+
+    report['errors_truncated'] = report['failed'] > len(report['errors'])
+    return report
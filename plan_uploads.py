@@ -0,0 +1,234 @@
+from src.models.user import db
+from src.models.upload import FileUpload
+from datetime import datetime, timedelta
+import hashlib
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # POSIX only; elsewhere chunks are serialized per process (see write_chunk)
+
+PLAN_FILE_EXTENSIONS = {'pdf', 'dwg'}
+
+# Largest plan file accepted, and the chunk size suggested to clients
+MAX_PLAN_FILE_SIZE = 4 * 1024 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Bytes read from the request per write, so memory stays flat whatever the chunk size
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+class UploadConflict(Exception):
+    """A chunk did not start at the upload's current offset (or another chunk is in flight)"""
+
+    def __init__(self, offset, message='Chunk offset does not match the upload offset'):
+        super().__init__(message)
+        self.offset = offset
+
+# Running SHA-256 per upload id, as (offset, hash object); rebuilt from disk when missing
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+# Upload ids with a chunk being written in this process (only used without fcntl)
+_writing = set()
+
+def partial_path(root, upload_id):
+    return os.path.join(root, 'partial', f'{upload_id}.part')
+
+def stored_path(digest):
+    """Content-addressed location of a completed plan file, relative to the plan files root"""
+    return os.path.join('files', digest[:2], digest)
+
+def upload_offset(root, upload):
+    """Bytes received so far (the partial file is the source of truth)"""
+    if upload.status == 'complete':
+        return upload.size
+    try:
+        return os.path.getsize(partial_path(root, upload.id))
+    except FileNotFoundError:
+        return 0
+
+def _hasher_at(upload_id, path, offset):
+    """Hash state after the first offset bytes, re-reading the partial file only if it was not kept"""
+    with _hashers_lock:
+        cached = _hashers.pop(upload_id, None)
+    if cached is not None and cached[0] == offset:
+        return cached[1]
+
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(STREAM_BUFFER_SIZE), b''):
+            hasher.update(chunk)
+    return hasher
+
+def start_upload(root, plan_id, filename, size, expected_sha256=None):
+    """Create an upload session and its empty partial file
+
+    The client's sha256 is only checked against the received bytes at
+    finalize; identical content is deduplicated in storage then, never on the
+    client's word.
+    """
+    upload = FileUpload(plan_id=plan_id, filename=filename, size=size, expected_sha256=expected_sha256)
+    db.session.add(upload)
+    db.session.flush()
+
+    path = partial_path(root, upload.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'ab').close()
+    return upload
+
+def write_chunk(root, upload, offset, stream):
+    """Append a chunk read from a stream at the given offset, returning the new offset
+
+    The partial file is locked while writing, so concurrent chunks for one
+    upload are rejected instead of interleaved. If the client disconnects
+    mid-chunk, the bytes that did arrive are kept and the upload resumes
+    from there.
+
+    The lock is an flock on POSIX. Where fcntl is missing (Windows) it falls
+    back to a per-process guard, which does not see chunks written by other
+    worker processes; run a single worker process there.
+    """
+    path = partial_path(root, upload.id)
+    if not os.path.exists(path):
+        raise ValueError('Upload is not in progress')
+
+    if fcntl is None:
+        with _hashers_lock:
+            if upload.id in _writing:
+                raise UploadConflict(upload_offset(root, upload), 'Another chunk is being written')
+            _writing.add(upload.id)
+    try:
+        with open(path, 'ab') as output:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(output, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise UploadConflict(upload_offset(root, upload), 'Another chunk is being written')
+            return _append_chunk(path, upload, offset, stream, output)
+    finally:
+        if fcntl is None:
+            with _hashers_lock:
+                _writing.discard(upload.id)
+
+def _append_chunk(path, upload, offset, stream, output):
+    """Body of write_chunk, run with the partial file locked"""
+    current = output.seek(0, os.SEEK_END)
+    if offset != current:
+        raise UploadConflict(current)
+
+    hasher = _hasher_at(upload.id, path, current)
+    remaining = upload.size - current
+    try:
+        while True:
+            chunk = stream.read(min(STREAM_BUFFER_SIZE, remaining + 1))
+            if not chunk:
+                break
+            if len(chunk) > remaining:
+                output.truncate(current)
+                raise ValueError('Chunk runs past the declared file size')
+            output.write(chunk)
+            hasher.update(chunk)
+            current += len(chunk)
+            remaining -= len(chunk)
+    finally:
+        output.flush()
+        if output.tell() == current:
+            with _hashers_lock:
+                _hashers[upload.id] = (current, hasher)
+
+    return current
+
+def finish_upload(root, upload):
+    """Verify a fully received upload and move it to content-addressed storage
+
+    Returns the stored path; identical content already on disk is reused and
+    the partial file dropped.
+    """
+    if upload.status == 'complete':
+        return stored_path(upload.sha256)
+
+    path = partial_path(root, upload.id)
+    offset = upload_offset(root, upload)
+    if offset != upload.size:
+        raise UploadConflict(offset, f'Upload incomplete: {offset} of {upload.size} bytes received')
+
+    digest = _hasher_at(upload.id, path, offset).hexdigest()
+    if upload.expected_sha256 and digest != upload.expected_sha256:
+        # Corrupt transfer, start over
+        open(path, 'wb').close()
+        raise ValueError('SHA-256 does not match the uploaded content')
+
+    relative_path = stored_path(digest)
+    target = os.path.join(root, relative_path)
+    if os.path.exists(target):
+        os.remove(path)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+    with _hashers_lock:
+        _hashers.pop(upload.id, None)
+
+    upload.sha256 = digest
+    upload.status = 'complete'
+    return relative_path
+
+def discard_upload(root, upload):
+    """Drop the partial data of an abandoned upload"""
+    with _hashers_lock:
+        _hashers.pop(upload.id, None)
+    path = partial_path(root, upload.id)
+    if os.path.exists(path):
+        os.remove(path)
+
+def expire_uploads(root, max_age):
+    """Delete uploads left unfinished for longer than max_age seconds, with their partial files
+
+    Activity is the partial file's mtime (chunks do not touch the upload row).
+    Returns the number of uploads removed.
+    """
+    cutoff = time.time() - max_age
+    stale = []
+    for upload in FileUpload.query.filter(FileUpload.status == 'uploading',
+                                          FileUpload.created_at < datetime.utcnow() - timedelta(seconds=max_age)):
+        try:
+            last_write = os.path.getmtime(partial_path(root, upload.id))
+        except FileNotFoundError:
+            last_write = 0
+        if last_write < cutoff:
+            stale.append(upload)
+
+    for upload in stale:
+        try:
+            discard_upload(root, upload)
+        except FileNotFoundError:
+            pass  # another worker got there first
+        db.session.delete(upload)
+
+    # Hash state kept here for uploads that finished or expired in another worker
+    with _hashers_lock:
+        cached_ids = list(_hashers)
+    if cached_ids:
+        live = {upload_id for (upload_id,) in db.session.query(FileUpload.id)
+                                                 .filter(FileUpload.id.in_(cached_ids),
+                                                         FileUpload.status == 'uploading')}
+        with _hashers_lock:
+            for upload_id in cached_ids:
+                if upload_id not in live:
+                    _hashers.pop(upload_id, None)
+    return len(stale)
+
+def plan_file_entry(upload):
+    return {'name': upload.filename, 'sha256': upload.sha256, 'size': upload.size}
+
+def attach_plan_file(plan, entry):
+    """Add a completed upload to the plan's stored files, replacing any entry with the same content
+
+    Stored files carry their hash, so they live in a private column and
+    never appear in plan listings; plan_files keeps its plain URLs.
+    """
+    files = [item for item in plan.get_stored_plan_files() if item.get('sha256') != entry['sha256']]
+    files.append(entry)
+    plan.set_stored_plan_files(files)
@@ -0,0 +1,65 @@
+from src.models.user import db
+from src.models.house_plan import HousePlan, Category
+from src.models.order import Order, OrderItem
+from src.models.payment import Payment
+from src.models.serializers import cart_statement, PLAN_COLUMNS
+from src.routes.house_plans import filter_plans_query
+from werkzeug.datastructures import MultiDict
+import re
+
+# Tables that must never be read with a full scan on a hot route
+WATCHED_TABLES = {'house_plan', 'plan_categories', 'order', 'order_item', 'cart_item', 'payment'}
+
+def route_queries():
+    """Representative (name, query) pairs for the hot route queries"""
+    def plan_listing(**args):
+        query = HousePlan.query.filter(HousePlan.is_active == True)
+        query, _ = filter_plans_query(query, MultiDict(args))
+        return query.order_by(HousePlan.is_featured.desc(), HousePlan.created_at.desc()).limit(12)
+
+    return [
+        ('house-plans', plan_listing()),
+        ('house-plans?min_price&max_price', plan_listing(min_price='1000', max_price='2000')),
+        ('house-plans?bedrooms', plan_listing(bedrooms='3')),
+        ('house-plans?bedrooms&bathrooms', plan_listing(bedrooms='3', bathrooms='2')),
+        ('house-plans?category', plan_listing(category='modern')),
+        ('featured-plans', HousePlan.query.filter_by(is_featured=True, is_active=True)
+                                          .order_by(HousePlan.created_at.desc()).limit(6)),
+        ('styles', db.session.query(HousePlan.style_category)
+                             .filter(HousePlan.is_active == True).distinct()),
+        ('categories', Category.plan_counts_query()),
+        ('orders', Order.query.filter_by(user_id=1).order_by(Order.created_at.desc()).limit(10)),
+        ('order items', OrderItem.query.filter_by(order_id=1)),
+        ('cart', cart_statement(1, PLAN_COLUMNS + ('price',))),
+        ('payment by order', Payment.query.filter_by(order_id=1)),
+        ('payment by gateway reference', Payment.query.filter_by(gateway_reference='PF_1')),
+    ]
+
+def explain(query):
+    """Get the EXPLAIN QUERY PLAN detail lines for a query (ORM query or Core select)"""
+    statement = getattr(query, 'statement', query)
+    sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    return [row[3] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+def full_scans(plan):
+    """Find plan steps that scan a watched table without an index"""
+    scans = []
+    for detail in plan:
+        words = detail.split()
+        if len(words) >= 2 and words[0] == 'SCAN' and 'INDEX' not in words:
+            # Joined tables show up under their SQLAlchemy alias, e.g. plan_categories_1
+            if re.sub(r'_\d+$', '', words[1]) in WATCHED_TABLES:
+                scans.append(detail)
+    return scans
+
+def check_query_plans():
+    """Run EXPLAIN QUERY PLAN on every hot route query, returning {name: [full scans]}"""
+    if db.engine.dialect.name != 'sqlite':
+        return {}
+
+    regressions = {}
+    for name, query in route_queries():
+        scans = full_scans(explain(query))
+        if scans:
+            regressions[name] = scans
+    return regressions
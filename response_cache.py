@@ -0,0 +1,148 @@
+from flask import request, make_response, Response, g
+from src.models.catalog import get_catalog_version
+from collections import OrderedDict
+from functools import wraps
+import threading
+import time
+
+class ResponseCache:
+    """Bounded in-process cache of rendered responses with TTL expiry and LRU eviction
+
+    Entries are keyed on (endpoint, normalized query args, view args). Writers
+    invalidate the endpoints they affect; the TTL bounds staleness across
+    worker processes, which each hold their own cache.
+
+    A set can carry the catalog version its request started at. One older
+    than the newest version already stored is refused, so a read that
+    overlapped a write cannot store its stale body after the invalidation.
+    Lookups do not check versions; invalidation stays per endpoint.
+    """
+
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale = 0
+        self.version = None  # newest catalog version a set was rendered at
+
+    def init_app(self, app, config_prefix='RESPONSE_CACHE'):
+        """Read cache sizing from the app config"""
+        self.maxsize = app.config.setdefault(f'{config_prefix}_SIZE', self.maxsize)
+        self.ttl = app.config.setdefault(f'{config_prefix}_TTL', self.ttl)
+
+    @staticmethod
+    def make_key(endpoint, args, view_args=None):
+        """Build a cache key from the endpoint and its normalized arguments"""
+        normalized = tuple(sorted((key, value.strip()) for key, value in args.items(multi=True)
+                                  if value.strip()))
+        return (endpoint, normalized, tuple(sorted((view_args or {}).items())))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, version=None):
+        """Store a value, unless it was rendered at a catalog version older than one already seen"""
+        with self._lock:
+            if version is not None:
+                if self.version is not None and version < self.version:
+                    self.stale += 1
+                    return False
+                self.version = version
+            self._entries[key] = (time.monotonic() + self.ttl, version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def discard(self, key, version):
+        """Drop an entry stored at the given catalog version (a newer one is left alone)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == version:
+                del self._entries[key]
+                self.stale += 1
+
+    def invalidate(self, *endpoints):
+        """Drop every cached entry for the given endpoints"""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] in endpoints]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self.version = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'stale': self.stale
+            }
+
+response_cache = ResponseCache()
+
+# Rendered checkout summaries keyed on (user_id, cart version, catalog version, plan fields).
+# Cart and catalog writes change the key, so entries are never invalidated, only aged out.
+checkout_summary_cache = ResponseCache(maxsize=1024, ttl=600)
+
+def cached_response(view):
+    """Serve successful responses for a read-only route from the response cache
+
+    A miss is stored with the catalog version read before rendering (by
+    conditional_get when it wraps this route, so hits cost no extra query).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = response_cache.make_key(request.endpoint, request.args, request.view_args)
+        cached = response_cache.get(key)
+        if cached is not None:
+            body, mimetype = cached
+            return Response(body, status=200, mimetype=mimetype)
+
+        version = g.get('catalog_version')
+        if version is None:
+            version, _ = get_catalog_version()
+
+        response = make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            if response_cache.set(key, (response.get_data(), response.mimetype), version):
+                # A write that committed (and invalidated) while this response rendered moved the version on
+                if get_catalog_version()[0] != version:
+                    response_cache.discard(key, version)
+        return response
+    return wrapper
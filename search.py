@@ -0,0 +1,106 @@
+from src.models.user import db
+from sqlalchemy import text, Integer, Float
+from sqlalchemy.exc import OperationalError
+import re
+
+# Full-text index over active house plans (SQLite FTS5, external content)
+SEARCH_TABLE = 'house_plan_fts'
+
+# bm25 column weights: title, description, style_category
+SEARCH_WEIGHTS = (10.0, 1.0, 5.0)
+
+_SEARCH_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        title, description, style_category,
+        content='house_plan', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    # Only active plans are indexed, so a soft delete drops the plan from search
+    f"""CREATE TRIGGER IF NOT EXISTS house_plan_fts_ai AFTER INSERT ON house_plan
+        WHEN new.is_active BEGIN
+            INSERT INTO {SEARCH_TABLE}(rowid, title, description, style_category)
+            VALUES (new.id, new.title, new.description, new.style_category);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS house_plan_fts_ad AFTER DELETE ON house_plan
+        WHEN old.is_active BEGIN
+            INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, description, style_category)
+            VALUES ('delete', old.id, old.title, old.description, old.style_category);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS house_plan_fts_au AFTER UPDATE ON house_plan BEGIN
+            INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, title, description, style_category)
+            SELECT 'delete', old.id, old.title, old.description, old.style_category WHERE old.is_active;
+            INSERT INTO {SEARCH_TABLE}(rowid, title, description, style_category)
+            SELECT new.id, new.title, new.description, new.style_category WHERE new.is_active;
+        END""",
+]
+
+# FTS5 support per database URL, probed once; SQLite builds without it use the LIKE filters
+_fts5_support = {}
+
+def probe_fts5(engine):
+    """Try to create a throwaway FTS5 table, which fails when SQLite was built without FTS5"""
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(content)"))
+            connection.execute(text("DROP TABLE temp.fts5_probe"))
+    except OperationalError:
+        return False
+    return True
+
+def search_enabled():
+    """Check whether the database supports the FTS5 search index"""
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    key = str(db.engine.url)
+    if key not in _fts5_support:
+        _fts5_support[key] = probe_fts5(db.engine)
+    return _fts5_support[key]
+
+def init_search_index():
+    """Create the search index and its sync triggers, backfilling on first run"""
+    if not search_enabled():
+        return
+
+    exists = db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {'name': SEARCH_TABLE}
+    ).first()
+
+    for statement in _SEARCH_SCHEMA:
+        db.session.execute(text(statement))
+
+    if not exists:
+        db.session.execute(text(
+            f"INSERT INTO {SEARCH_TABLE}(rowid, title, description, style_category) "
+            f"SELECT id, title, description, style_category FROM house_plan WHERE is_active"
+        ))
+
+    db.session.commit()
+
+def rebuild_search_index():
+    """Drop and re-index every active plan"""
+    if not search_enabled():
+        return
+
+    db.session.execute(text(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('delete-all')"))
+    db.session.execute(text(
+        f"INSERT INTO {SEARCH_TABLE}(rowid, title, description, style_category) "
+        f"SELECT id, title, description, style_category FROM house_plan WHERE is_active"
+    ))
+    db.session.commit()
+
+def build_match_query(search):
+    """Turn free text into a safe FTS5 query with prefix matching on every term"""
+    terms = re.findall(r'\w+', search or '')
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_subquery(match):
+    """Subquery of (rowid, rank) for plans matching an FTS5 query, best first"""
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    return text(
+        f"SELECT rowid, bm25({SEARCH_TABLE}, {weights}) AS rank "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match"
+    ).bindparams(match=match).columns(rowid=Integer, rank=Float).subquery('plan_search')
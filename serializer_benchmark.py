@@ -0,0 +1,111 @@
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from src.models.user import db
+from src.models.house_plan import HousePlan, Category, plan_categories
+from src.models.order import Order, OrderItem
+from src.models.payment import PaymentMethod
+from src.models.catalog import init_catalog_version
+from src.models.serializers import serialize_plans, serialize_orders, serialize_payment_methods
+from src.routes.catalog_benchmark import seed_plans, time_call, STYLES
+from src.routes.json_provider import FastJSONProvider
+import os
+import random
+import tempfile
+
+def seed_related(plan_count, order_count, items_per_order):
+    """Categories, plan/category links, orders and payment methods for the benchmark catalog"""
+    rng = random.Random(7)
+    categories = [Category(name=style, slug=style.lower(), description=f'{style} designs') for style in STYLES]
+    db.session.add_all(categories)
+    db.session.flush()
+
+    db.session.execute(plan_categories.insert(), [
+        {'plan_id': plan_id, 'category_id': category_id}
+        for plan_id in range(1, plan_count + 1)
+        for category_id in sorted(rng.sample([category.id for category in categories], 2))
+    ])
+
+    for index in range(order_count):
+        order = Order(user_id=1, total_amount=0, status='paid')
+        order.set_billing_address({'city': 'Durban', 'line1': f'{index} Marine Parade'})
+        db.session.add(order)
+        db.session.flush()
+        for plan_id in rng.sample(range(1, plan_count + 1), items_per_order):
+            db.session.add(OrderItem(order_id=order.id, plan_id=plan_id, quantity=1, unit_price=1500.0))
+
+    method = PaymentMethod(name='Credit Card', code='credit_card', gateway='payfast', display_order=1)
+    method.set_supported_cards(['visa', 'mastercard', 'amex'])
+    db.session.add(method)
+    db.session.commit()
+
+def run_serializer_benchmark(plan_count=2000, page_size=48, order_count=20, items_per_order=3, repeat=20):
+    """Compare to_dict() + stdlib JSON against row-tuple serializers + FastJSONProvider
+
+    Each case renders the same response body both ways; the bodies must match byte for byte.
+    """
+    bench_app = Flask(__name__)
+
+    with tempfile.TemporaryDirectory() as directory:
+        bench_app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        bench_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(bench_app)
+
+        default_json = DefaultJSONProvider(bench_app)
+        fast_json = FastJSONProvider(bench_app)
+
+        with bench_app.app_context():
+            db.create_all()
+            init_catalog_version()
+            seed_plans(plan_count)
+            seed_related(plan_count, order_count, items_per_order)
+
+            plan_ids = [row[0] for row in db.session.query(HousePlan.id).filter(HousePlan.is_active == True)
+                                                    .order_by(HousePlan.id).limit(page_size)]
+            order_ids = [row[0] for row in db.session.query(Order.id).order_by(Order.id)]
+
+            cases = [
+                ('house plans page',
+                 lambda: [plan.to_dict() for plan in HousePlan.query.filter(HousePlan.id.in_(plan_ids))
+                                                                     .order_by(HousePlan.id)],
+                 lambda: serialize_plans(plan_ids)),
+                ('order history',
+                 lambda: [order.to_dict() for order in Order.query.filter(Order.id.in_(order_ids))
+                                                                   .order_by(Order.id)],
+                 lambda: serialize_orders(order_ids)),
+                ('payment methods',
+                 lambda: [method.to_dict() for method in PaymentMethod.query.order_by(PaymentMethod.display_order)],
+                 lambda: serialize_payment_methods()),
+                # orjson writes these as null, so the fast path must hand them to the stdlib
+                ('non-finite floats',
+                 lambda: [{'price': float('nan'), 'high': float('inf'), 'low': float('-inf'), 'note': None}],
+                 lambda: [{'price': float('nan'), 'high': float('inf'), 'low': float('-inf'), 'note': None}]),
+            ]
+
+            results = []
+            for name, orm_data, fast_data in cases:
+                def orm_path():
+                    body = default_json.response({'success': True, 'data': orm_data()}).get_data()
+                    db.session.expunge_all()
+                    return body
+
+                def fast_path():
+                    body = fast_json.response({'success': True, 'data': fast_data()}).get_data()
+                    db.session.expunge_all()
+                    return body
+
+                orm_ms, orm_body = time_call(orm_path, repeat)
+                fast_ms, fast_body = time_call(fast_path, repeat)
+
+                results.append({
+                    'case': name,
+                    'orm_ms': round(orm_ms, 3),
+                    'fast_ms': round(fast_ms, 3),
+                    'speedup': round(orm_ms / fast_ms, 1) if fast_ms else None,
+                    'bytes': len(fast_body),
+                    'identical': orm_body == fast_body
+                })
+
+            db.session.remove()
+            db.engine.dispose()
+
+    return {'plans': plan_count, 'page_size': page_size, 'results': results}
@@ -0,0 +1,360 @@
+from src.models.user import db, User
+from src.models.house_plan import HousePlan, Category, plan_categories, PLAN_FIELDS
+from src.models.order import Order, OrderItem, CartItem
+from src.models.payment import Payment, PaymentMethod
+from sqlalchemy import select, func
+import json
+
+# Fast-path serializers that build each model's to_dict() output straight from
+# row tuples, skipping ORM instances and their per-attribute descriptors. Key
+# order and values match to_dict() exactly, so responses are byte-identical.
+# The batch loaders issue a fixed number of queries however many rows they serialize.
+
+USER_COLUMNS = ('id', 'email', 'username', 'first_name', 'last_name', 'phone', 'is_admin', 'is_active',
+                'created_at', 'updated_at')
+
+CATEGORY_COLUMNS = ('id', 'name', 'slug', 'description', 'image_url', 'is_active', 'created_at')
+
+PLAN_COLUMNS = PLAN_FIELDS + ('created_by',)
+
+ORDER_COLUMNS = ('id', 'order_number', 'user_id', 'status', 'total_amount', 'payment_method',
+                 'payment_reference', 'billing_address', 'created_at', 'updated_at')
+
+ORDER_ITEM_COLUMNS = ('id', 'order_id', 'plan_id', 'quantity', 'unit_price', 'total_price')
+
+CART_ITEM_COLUMNS = ('id', 'user_id', 'plan_id', 'quantity', 'created_at')
+
+PAYMENT_COLUMNS = ('id', 'order_id', 'payment_method', 'payment_gateway', 'amount', 'currency', 'status',
+                   'gateway_reference', 'transaction_id', 'card_type', 'card_last_four', 'bank_name',
+                   'bank_reference', 'created_at', 'updated_at', 'gateway_response')
+
+PAYMENT_METHOD_COLUMNS = ('id', 'name', 'code', 'gateway', 'is_active', 'display_order', 'description',
+                          'icon_url', 'supported_cards', 'supported_banks')
+
+def columns(model, names):
+    return [getattr(model, name) for name in names]
+
+def json_text(raw, default):
+    """Decode a JSON text column the way decode_json_text does"""
+    if not raw:
+        return default()
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return default()
+
+def user_from_row(row):
+    (user_id, email, username, first_name, last_name, phone, is_admin, is_active,
+     created_at, updated_at) = row
+    return {
+        'id': user_id,
+        'email': email,
+        'username': username,
+        'first_name': first_name,
+        'last_name': last_name,
+        'full_name': f"{first_name} {last_name}".strip(),
+        'phone': phone,
+        'is_admin': is_admin,
+        'is_active': is_active,
+        'created_at': created_at.isoformat() if created_at else None,
+        'updated_at': updated_at.isoformat() if updated_at else None
+    }
+
+def category_from_row(row, plan_count):
+    category_id, name, slug, description, image_url, is_active, created_at = row
+    return {
+        'id': category_id,
+        'name': name,
+        'slug': slug,
+        'description': description,
+        'image_url': image_url,
+        'is_active': is_active,
+        'created_at': created_at.isoformat() if created_at else None,
+        'plan_count': plan_count
+    }
+
+def plan_from_row(row, categories, creator):
+    (plan_id, title, description, price, bedrooms, bathrooms, stories, garage_spaces, square_footage,
+     style_category, featured_image_url, gallery_images, gallery_media, plan_files, is_featured, is_active,
+     created_at, updated_at, _) = row
+    return {
+        'id': plan_id,
+        'title': title,
+        'description': description,
+        'price': price,
+        'bedrooms': bedrooms,
+        'bathrooms': bathrooms,
+        'stories': stories,
+        'garage_spaces': garage_spaces,
+        'square_footage': square_footage,
+        'style_category': style_category,
+        'featured_image_url': featured_image_url,
+        'gallery_images': json_text(gallery_images, list),
+        'gallery_media': json_text(gallery_media, list),
+        'plan_files': json_text(plan_files, list),
+        'is_featured': is_featured,
+        'is_active': is_active,
+        'created_at': created_at.isoformat() if created_at else None,
+        'updated_at': updated_at.isoformat() if updated_at else None,
+        'categories': categories,
+        'creator': creator
+    }
+
+def order_item_from_row(row, plan):
+    item_id, order_id, plan_id, quantity, unit_price, total_price = row
+    return {
+        'id': item_id,
+        'order_id': order_id,
+        'plan_id': plan_id,
+        'quantity': quantity,
+        'unit_price': unit_price,
+        'total_price': total_price,
+        'plan': plan
+    }
+
+def order_from_row(row, items, user):
+    (order_id, order_number, user_id, status, total_amount, payment_method, payment_reference,
+     billing_address, created_at, updated_at) = row
+    return {
+        'id': order_id,
+        'order_number': order_number,
+        'user_id': user_id,
+        'status': status,
+        'total_amount': total_amount,
+        'payment_method': payment_method,
+        'payment_reference': payment_reference,
+        'billing_address': json_text(billing_address, dict),
+        'created_at': created_at.isoformat() if created_at else None,
+        'updated_at': updated_at.isoformat() if updated_at else None,
+        'items': items,
+        'user': user
+    }
+
+def cart_item_from_row(row, plan, price):
+    """Cart item dict; price is the plan's price (None when the plan is gone)"""
+    item_id, user_id, plan_id, quantity, created_at = row
+    return {
+        'id': item_id,
+        'user_id': user_id,
+        'plan_id': plan_id,
+        'quantity': quantity,
+        'created_at': created_at.isoformat() if created_at else None,
+        'plan': plan,
+        'total_price': price * quantity if plan is not None else 0
+    }
+
+def plan_fields_from_row(row, fields):
+    """Projected plan dict (as HousePlan.to_summary_dict) from the selected field columns"""
+    data = {}
+    for field, value in zip(fields, row):
+        if field in ('gallery_images', 'gallery_media', 'plan_files'):
+            data[field] = json_text(value, list)
+        elif field in ('created_at', 'updated_at'):
+            data[field] = value.isoformat() if value else None
+        else:
+            data[field] = value
+    return data
+
+def payment_from_row(row):
+    (payment_id, order_id, payment_method, payment_gateway, amount, currency, status, gateway_reference,
+     transaction_id, card_type, card_last_four, bank_name, bank_reference, created_at, updated_at,
+     gateway_response) = row
+    return {
+        'id': payment_id,
+        'order_id': order_id,
+        'payment_method': payment_method,
+        'payment_gateway': payment_gateway,
+        'amount': amount,
+        'currency': currency,
+        'status': status,
+        'gateway_reference': gateway_reference,
+        'transaction_id': transaction_id,
+        'card_type': card_type,
+        'card_last_four': card_last_four,
+        'bank_name': bank_name,
+        'bank_reference': bank_reference,
+        'created_at': created_at.isoformat() if created_at else None,
+        'updated_at': updated_at.isoformat() if updated_at else None,
+        'gateway_response': json_text(gateway_response, dict)
+    }
+
+def payment_method_from_row(row):
+    (method_id, name, code, gateway, is_active, display_order, description, icon_url,
+     supported_cards, supported_banks) = row
+    return {
+        'id': method_id,
+        'name': name,
+        'code': code,
+        'gateway': gateway,
+        'is_active': is_active,
+        'display_order': display_order,
+        'description': description,
+        'icon_url': icon_url,
+        'supported_cards': json_text(supported_cards, list),
+        'supported_banks': json_text(supported_banks, list)
+    }
+
+def serialize_users(user_ids):
+    """User dicts by id, in one query"""
+    if not user_ids:
+        return {}
+    rows = db.session.execute(select(*columns(User, USER_COLUMNS)).where(User.id.in_(set(user_ids))))
+    return {row[0]: user_from_row(row) for row in rows}
+
+def serialize_plan_categories(plan_ids):
+    """Category dicts (with active plan counts) of each plan, in category id order, in two queries"""
+    if not plan_ids:
+        return {}
+
+    links = db.session.execute(
+        select(plan_categories.c.plan_id, *columns(Category, CATEGORY_COLUMNS))
+        .join(Category, Category.id == plan_categories.c.category_id)
+        .where(plan_categories.c.plan_id.in_(set(plan_ids)))
+        .order_by(plan_categories.c.plan_id, Category.id)
+    ).all()
+    if not links:
+        return {}
+
+    # Active plan counts for just these categories
+    category_ids = {row[1] for row in links}
+    plan_counts = dict(db.session.execute(
+        select(plan_categories.c.category_id, func.count(HousePlan.id))
+        .join(HousePlan, HousePlan.id == plan_categories.c.plan_id)
+        .where(plan_categories.c.category_id.in_(category_ids), HousePlan.is_active == True)
+        .group_by(plan_categories.c.category_id)
+    ).all())
+
+    by_id = {}
+    categories = {}
+    for row in links:
+        category = by_id.get(row[1])
+        if category is None:
+            category = by_id[row[1]] = category_from_row(row[1:], plan_counts.get(row[1], 0))
+        categories.setdefault(row[0], []).append(category)
+    return categories
+
+def serialize_plans(plan_ids):
+    """Full plan dicts (as HousePlan.to_dict) for the given ids, kept in order, in at most four queries"""
+    if not plan_ids:
+        return []
+
+    rows = {row[0]: row for row in db.session.execute(
+        select(*columns(HousePlan, PLAN_COLUMNS)).where(HousePlan.id.in_(set(plan_ids)))
+    )}
+    categories = serialize_plan_categories(list(rows))
+    creators = serialize_users([row[-1] for row in rows.values() if row[-1] is not None])
+
+    return [plan_from_row(rows[plan_id], categories.get(plan_id, []), creators.get(rows[plan_id][-1]))
+            for plan_id in plan_ids if plan_id in rows]
+
+def serialize_orders(order_ids):
+    """Full order dicts (as Order.to_dict) for the given ids, kept in order, in a fixed number of queries"""
+    if not order_ids:
+        return []
+
+    rows = {row[0]: row for row in db.session.execute(
+        select(*columns(Order, ORDER_COLUMNS)).where(Order.id.in_(set(order_ids)))
+    )}
+    item_rows = db.session.execute(
+        select(*columns(OrderItem, ORDER_ITEM_COLUMNS))
+        .where(OrderItem.order_id.in_(list(rows)))
+        .order_by(OrderItem.order_id, OrderItem.id)
+    ).all()
+
+    plan_ids = list({row[2] for row in item_rows})
+    plans = {plan['id']: plan for plan in serialize_plans(plan_ids)}
+    users = serialize_users([row[2] for row in rows.values()])
+
+    items = {}
+    for row in item_rows:
+        items.setdefault(row[1], []).append(order_item_from_row(row, plans.get(row[2])))
+
+    return [order_from_row(rows[order_id], items.get(order_id, []), users.get(rows[order_id][2]))
+            for order_id in order_ids if order_id in rows]
+
+def cart_statement(user_id, plan_names):
+    """Cart rows with the plan columns, line total and item count in a single SELECT
+
+    Each row is the cart item columns, the plan_names columns and then the
+    cart-wide SUM(price * quantity) and COUNT(*) window aggregates. Items whose
+    plan is gone keep NULL plan columns and count as items but not towards the total.
+    Rows come in plan order, straight off the unique (user_id, plan_id) index.
+    """
+    return (select(*columns(CartItem, CART_ITEM_COLUMNS), *columns(HousePlan, plan_names),
+                   func.sum(HousePlan.price * CartItem.quantity).over(), func.count().over())
+            .outerjoin(HousePlan, HousePlan.id == CartItem.plan_id)
+            .where(CartItem.user_id == user_id)
+            .order_by(CartItem.plan_id))
+
+def serialize_cart(user_id, plan_fields=None):
+    """Cart item dicts (as CartItem.to_dict) with the cart total and item count
+
+    One query for the items, plan columns and aggregates; the full plan view
+    adds the category and creator lookups of serialize_plans. The count stays
+    fixed however many items the cart holds. Returns (items, total_amount, item_count).
+    """
+    plan_names = (PLAN_COLUMNS if plan_fields is None else tuple(plan_fields)) + ('price',)
+    rows = db.session.execute(cart_statement(user_id, plan_names)).all()
+    if not rows:
+        return [], 0, 0
+
+    start = len(CART_ITEM_COLUMNS)
+    end = start + len(plan_names)
+    plan_rows = [row[start:end] for row in rows]
+
+    if plan_fields is None:
+        plan_ids = [plan_row[0] for plan_row in plan_rows if plan_row[0] is not None]
+        categories = serialize_plan_categories(plan_ids)
+        creators = serialize_users([plan_row[-2] for plan_row in plan_rows if plan_row[-2] is not None])
+
+    items = []
+    for row, plan_row in zip(rows, plan_rows):
+        plan = None
+        if plan_row[0] is not None:
+            if plan_fields is None:
+                plan = plan_from_row(plan_row[:-1], categories.get(plan_row[0], []), creators.get(plan_row[-2]))
+            else:
+                plan = plan_fields_from_row(plan_row[:-1], plan_fields)
+        items.append(cart_item_from_row(row[:start], plan, plan_row[-1]))
+
+    total_amount, item_count = rows[0][end:]
+    return items, total_amount or 0, item_count
+
+def serialize_plan_lookup(plan_ids, plan_fields=None):
+    """{plan_id: (plan dict, price)} for the given plans, full or projected, in one batched lookup"""
+    if plan_fields is None:
+        return {plan['id']: (plan, plan['price']) for plan in serialize_plans(plan_ids)}
+
+    rows = db.session.execute(
+        select(*columns(HousePlan, tuple(plan_fields) + ('price',))).where(HousePlan.id.in_(set(plan_ids)))
+    )
+    return {row[0]: (plan_fields_from_row(row[:-1], plan_fields), row[-1]) for row in rows}
+
+def serialize_guest_cart(quantities, plan_fields=None):
+    """Cart item dicts for a guest cart of {plan_id: quantity}, with total and count
+
+    Items are in plan order like a stored cart; they have no id or user_id
+    until the cart is merged. Returns (items, total_amount, item_count).
+    """
+    plans = serialize_plan_lookup(list(quantities), plan_fields) if quantities else {}
+
+    items = []
+    total_amount = 0
+    for plan_id in sorted(quantities):
+        plan, price = plans.get(plan_id, (None, None))
+        items.append(cart_item_from_row((None, None, plan_id, quantities[plan_id], None), plan, price))
+        if plan is not None:
+            total_amount += price * quantities[plan_id]
+    return items, total_amount, len(items)
+
+def serialize_payment_methods(query_filter=None):
+    """Payment method dicts in display order"""
+    statement = select(*columns(PaymentMethod, PAYMENT_METHOD_COLUMNS))
+    if query_filter is not None:
+        statement = statement.where(query_filter)
+    statement = statement.order_by(PaymentMethod.display_order)
+    return [payment_method_from_row(row) for row in db.session.execute(statement)]
+
+def serialize_payment(payment_id):
+    row = db.session.execute(select(*columns(Payment, PAYMENT_COLUMNS)).where(Payment.id == payment_id)).first()
+    return payment_from_row(row) if row is not None else None
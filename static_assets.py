@@ -0,0 +1,166 @@
+from flask import Response, send_file
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # optional dependency, only gzip variants are generated without it
+    brotli = None
+
+# Build-tool fingerprints: a hex hash with letters and digits (main.3f2a9c1b.css,
+# main.3f2a9c1b.chunk.js) or Rollup/Vite's 8-character base64url hash with mixed case
+# and a digit (index-BXa3fJ2k.js). Sizes and dates such as icon-180x180.png or
+# hero-2024.jpg are not hashes; a missed fingerprint only costs a revalidation.
+FINGERPRINT_PATTERN = re.compile(r'[-.](?:(?=[0-9a-f]*[a-f])(?=[0-9a-f]*\d)[0-9a-f]{8,}'
+                                 r'|(?=[\w-]*[A-Z])(?=[\w-]*[a-z])(?=[\w-]*\d)[\w-]{8})'
+                                 r'(?:\.[A-Za-z0-9]+)+$')
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/xml',
+                      'image/svg+xml', 'application/wasm', 'application/manifest+json')
+
+# Files smaller than this are not worth compressing; files larger are served from disk instead of memory
+MIN_COMPRESS_SIZE = 1024
+MAX_MEMORY_SIZE = 1024 * 1024
+
+# Precompressed siblings produced by the frontend build, by content coding (preferred first)
+VARIANT_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+
+class StaticAsset:
+    """One file of the static folder, with its hash and in-memory bodies"""
+
+    __slots__ = ('path', 'mimetype', 'digest', 'size', 'body', 'variants', 'fingerprinted', 'stamp')
+
+    def __init__(self, path, mimetype, digest, size, body, variants, fingerprinted, stamp=None):
+        self.path = path
+        self.mimetype = mimetype
+        self.digest = digest
+        self.size = size
+        self.body = body  # None for large files, which are streamed from disk
+        self.variants = variants  # content coding -> compressed bytes
+        self.fingerprinted = fingerprinted
+        self.stamp = stamp  # file_stamp() when loaded, to skip unchanged files on rebuild
+
+def file_stamp(full_path):
+    """mtime and size of a file and its precompressed siblings, so changes show up without reading them"""
+    stamp = []
+    for suffix in ('',) + tuple(suffix for _, suffix in VARIANT_SUFFIXES):
+        try:
+            stat = os.stat(full_path + suffix)
+        except FileNotFoundError:
+            stamp.append(None)
+        else:
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(stamp)
+
+def is_compressible(mimetype):
+    return mimetype.startswith(COMPRESSIBLE_TYPES)
+
+def compress_variants(full_path, data, mimetype):
+    """Compressed bodies of an asset, from build-tool siblings when present or made here"""
+    variants = {}
+    if not is_compressible(mimetype) or len(data) < MIN_COMPRESS_SIZE:
+        return variants
+
+    for coding, suffix in VARIANT_SUFFIXES:
+        if os.path.isfile(full_path + suffix):
+            with open(full_path + suffix, 'rb') as source:
+                variants[coding] = source.read()
+        elif coding == 'gzip':
+            variants[coding] = gzip.compress(data, compresslevel=9, mtime=0)
+        elif coding == 'br' and brotli is not None:
+            variants[coding] = brotli.compress(data, quality=11)
+
+    # Keep only variants that actually save bytes
+    return {coding: body for coding, body in variants.items() if len(body) < len(data)}
+
+class StaticManifest:
+    """Startup snapshot of the static folder so requests never stat the filesystem"""
+
+    def __init__(self, folder=None):
+        self.folder = folder
+        self.assets = {}
+        self.index = None
+
+    def build(self):
+        """Scan the static folder, reloading only files whose mtime or size changed since the last build"""
+        previous = self.assets
+        assets = {}
+        if self.folder and os.path.isdir(self.folder):
+            for directory, _, filenames in os.walk(self.folder):
+                for filename in filenames:
+                    full_path = os.path.join(directory, filename)
+                    path = os.path.relpath(full_path, self.folder).replace(os.sep, '/')
+
+                    # Precompressed siblings belong to the file they were made from
+                    if any(path.endswith(suffix) and os.path.isfile(full_path[:-len(suffix)])
+                           for _, suffix in VARIANT_SUFFIXES):
+                        continue
+
+                    stamp = file_stamp(full_path)
+                    asset = previous.get(path)
+                    if asset is None or asset.stamp != stamp:
+                        asset = self._load(full_path, path, stamp)
+                    assets[path] = asset
+
+        self.assets = assets
+        self.index = assets.get('index.html')
+        return self
+
+    def _load(self, full_path, path, stamp=None):
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        size = os.path.getsize(full_path)
+
+        digest = hashlib.sha256()
+        body = None
+        with open(full_path, 'rb') as source:
+            if size <= MAX_MEMORY_SIZE:
+                body = source.read()
+                digest.update(body)
+            else:
+                for chunk in iter(lambda: source.read(MAX_MEMORY_SIZE), b''):
+                    digest.update(chunk)
+
+        variants = compress_variants(full_path, body, mimetype) if body is not None else {}
+        fingerprinted = bool(FINGERPRINT_PATTERN.search(path))
+        return StaticAsset(full_path, mimetype, digest.hexdigest()[:32], size, body, variants, fingerprinted,
+                           stamp)
+
+    def get(self, path):
+        return self.assets.get(path)
+
+def negotiate_encoding(asset, accept_encodings):
+    """Best precompressed variant the client accepts, or None for the identity body"""
+    for coding, _ in VARIANT_SUFFIXES:
+        if coding in asset.variants and accept_encodings[coding] > 0:
+            return coding
+    return None
+
+def asset_response(asset, request):
+    """Serve an asset with its negotiated encoding, a strong ETag and long caching when fingerprinted"""
+    coding = negotiate_encoding(asset, request.accept_encodings)
+
+    if coding is not None:
+        response = Response(asset.variants[coding], mimetype=asset.mimetype)
+        response.headers['Content-Encoding'] = coding
+        response.set_etag(f'{asset.digest}-{coding}')
+    elif asset.body is not None:
+        response = Response(asset.body, mimetype=asset.mimetype)
+        response.set_etag(asset.digest)
+    else:
+        response = send_file(asset.path, mimetype=asset.mimetype, conditional=False, etag=False)
+        response.set_etag(asset.digest)
+
+    if asset.variants:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if asset.fingerprinted else REVALIDATE_CACHE_CONTROL
+
+    # 304 on a matching If-None-Match; byte ranges only for the identity body
+    if coding is None:
+        return response.make_conditional(request, accept_ranges=True, complete_length=asset.size)
+    return response.make_conditional(request)
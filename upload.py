@@ -0,0 +1,86 @@
+from src.models.user import db
+from src.models.json_text import decode_json_text
+from src.models.order import dialect_insert
+from datetime import datetime
+import json
+import uuid
+
+class FileUpload(db.Model):
+    """In-progress resumable upload of a plan file (the bytes live in a partial file on disk)"""
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    plan_id = db.Column(db.Integer, db.ForeignKey('house_plan.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    expected_sha256 = db.Column(db.String(64))  # optional, checked at finalize
+    sha256 = db.Column(db.String(64), index=True)  # set once the upload is complete
+    status = db.Column(db.String(20), default='uploading')  # uploading, complete
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<FileUpload {self.id}>'
+    
+    def to_dict(self, offset=None):
+        return {
+            'id': self.id,
+            'plan_id': self.plan_id,
+            'filename': self.filename,
+            'size': self.size,
+            'offset': self.size if self.status == 'complete' else offset,
+            'sha256': self.sha256,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class MediaImage(db.Model):
+    """An uploaded image by content hash, with its derivatives once they are rendered
+
+    Images uploaded before their plan exists (the admin form uploads first and
+    saves the URLs with the plan) are attached from here when a plan is saved
+    with their URL.
+    """
+    sha256 = db.Column(db.String(64), primary_key=True)
+    url = db.Column(db.String(500), nullable=False, index=True)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    derivatives = db.Column(db.Text)  # JSON list of rendered derivatives, empty until the pool is done
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<MediaImage {self.sha256}>'
+    
+    def get_derivatives(self):
+        return decode_json_text(self, 'derivatives', list)
+    
+    def to_entry(self):
+        """The gallery entry for this image (see plan_images.image_entry)"""
+        return {
+            'url': self.url,
+            'sha256': self.sha256,
+            'width': self.width,
+            'height': self.height,
+            'derivatives': self.get_derivatives()
+        }
+    
+    @classmethod
+    def save(cls, entry):
+        """Record an image entry in one upsert, as part of the current transaction
+
+        A rendered entry replaces what is stored; a bare one (just uploaded)
+        never overwrites derivatives rendered for the same content earlier.
+        """
+        values = {
+            'url': entry['url'],
+            'width': entry['width'],
+            'height': entry['height'],
+            'derivatives': json.dumps(entry['derivatives']),
+            'updated_at': datetime.utcnow()
+        }
+        statement = dialect_insert(cls).values(sha256=entry['sha256'], **values)
+        if entry['derivatives']:
+            statement = statement.on_conflict_do_update(index_elements=[cls.sha256], set_=values)
+        else:
+            statement = statement.on_conflict_do_nothing(index_elements=[cls.sha256])
+        db.session.execute(statement)